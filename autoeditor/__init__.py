@@ -1,5 +1,7 @@
 from .editor import VideoEditor
 from .tts import tts, get_duration, merge_audio_files
 from .srt import gen_srt_file
+from .prefetch import TTSPrefetcher
+from .partition import partition_script
 
-__all__ = ['VideoEditor', 'tts', 'get_duration', 'merge_audio_files', 'gen_srt_file']
+__all__ = ['VideoEditor', 'tts', 'get_duration', 'merge_audio_files', 'gen_srt_file', 'TTSPrefetcher', 'partition_script']
@@ -6,7 +6,7 @@ import os
 
 
 class VideoEditor:
-    def __init__(self, clip_duration, srt_path, wav_path, animate_text=True, clip_generation_mode="normal", part_number=1):
+    def __init__(self, clip_duration, srt_path, wav_path, animate_text=True, clip_generation_mode="normal", part_number=1, background_dir="inputs"):
         """
         Initialize the Editor object.
 
@@ -17,6 +17,8 @@ class VideoEditor:
             wav_path (str): The path to the WAV file.
             animate_text (bool): Whether to animate the text or not.
             clip_generation_mode (str): The mode for generating video clips.
+            part_number (int): The part number shown at the top of the video.
+            background_dir (str): The directory the background videos are picked from. Only read, so jobs can share it.
         """
         # The Y coordinate of the text.
         self.y_cord = 1080
@@ -30,11 +32,12 @@ class VideoEditor:
         # The mode for generating video clips.
         self.clip_generation_mode = clip_generation_mode
         # A list of background videos
-        self.bg_videos = [f for f in os.listdir("inputs") if f.endswith('.mp4')]
+        self.background_dir = background_dir
+        self.bg_videos = [f for f in os.listdir(background_dir) if f.endswith('.mp4')]
         # Randomly select a background video to use later
         self.bg_path = random.choice(self.bg_videos)
         self.background_video = VideoFileClip(
-            os.path.join("inputs", self.bg_path))
+            os.path.join(self.background_dir, self.bg_path))
         self.background_video = self.crop_and_resize_video()
 
         # Default vertical position (70% from top)
@@ -101,9 +104,10 @@ class VideoEditor:
 
         Args:
             output_path (str): The path to save the rendered video file. Default is "outputs/output.mp4".
+            temp_data_path (str): The directory for moviepy's temporary audio file.
 
         Returns:
-            None
+            bool: True if the video was written, False if the subtitles could not be created.
         """
         print("Rendering video...")
 
@@ -145,7 +149,7 @@ class VideoEditor:
             self.subtitles = self.subtitles.set_duration(self.rendered_video.duration)
         except Exception as e:
             print(f"Error initializing SubtitlesClip: {e}")
-            return
+            return False
 
         # Process cover image
         if self.cover_img_url:
@@ -177,11 +181,15 @@ class VideoEditor:
         self.result = self.result.set_duration(self.rendered_video.duration)
 
         # Save the video to the outputs folder
+        # Name the temporary audio after the output, so renders running at the same time don't share it
+        temp_audiofile = os.path.join(
+            temp_data_path, os.path.splitext(os.path.basename(output_path))[0] + "_temp_audio.mp3")
         self.result.write_videofile(
             output_path, fps=30, codec="libx264", bitrate="4000k",
-            preset='faster', threads=4
+            preset='faster', threads=4, temp_audiofile=temp_audiofile
         )
         print("Video rendered successfully!")
+        return True
 
     def crop_and_resize_video(self, video_clip=None, target_aspect_ratio=9/16, target_width=1080):
         if video_clip is None:
@@ -219,7 +227,7 @@ class VideoEditor:
 
             next_clip_path = random.choice(self.bg_videos)
             self.bg_videos.remove(next_clip_path)
-            next_clip = VideoFileClip(os.path.join("inputs", next_clip_path))
+            next_clip = VideoFileClip(os.path.join(self.background_dir, next_clip_path))
             next_clip = self.crop_and_resize_video(next_clip)
 
             if combined_clip is None:
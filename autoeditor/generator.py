@@ -5,7 +5,38 @@ from .tts import tts, get_duration, merge_audio_files, get_random_voice
 from .srt import gen_srt_file
 from .editor import VideoEditor
 
-def generate_video(input_json_path, clip_generation_mode="normal", part_number=1, selected_voice=None):
+def split_into_sentences(text):
+    # Handle common abbreviations
+    text = re.sub(r'(?<=[A-Z])\.(?=[A-Z]\.)', '<PERIOD>', text)
+    text = re.sub(r'(?<=Dr)\.', '<PERIOD>', text)
+    text = re.sub(r'(?<=Mr)\.', '<PERIOD>', text)
+    text = re.sub(r'(?<=Mrs)\.', '<PERIOD>', text)
+    text = re.sub(r'(?<=Ms)\.', '<PERIOD>', text)
+    # Add more abbreviations as needed
+
+    # Split sentences
+    sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', text)
+
+    # Restore periods in abbreviations
+    sentences = [s.replace('<PERIOD>', '.') for s in sentences]
+
+    return [s.strip() for s in sentences if s.strip()]
+
+def generate_video(input_json_path, clip_generation_mode="normal", part_number=1, selected_voice=None, prefetcher=None, job=None, on_audio_ready=None):
+    # With a JobContext all intermediate files go to the job's workspace instead of the shared outputs/ and operation_data/
+    if job is not None:
+        audio_dir = job.audio_dir(part_number)
+        srt_path = job.srt_path(part_number)
+        wav_path = job.wav_path(part_number)
+        output_filename = job.video_path(part_number)
+        temp_data_path = job.part_dir(part_number)
+    else:
+        audio_dir = "outputs"
+        srt_path = "operation_data/output.srt"
+        wav_path = "operation_data/output.wav"
+        output_filename = f"outputs/reel_output_p{part_number}.mp4"
+        temp_data_path = "operation_data"
+
     # Read the content from the JSON file
     with open(input_json_path, 'r') as f:
         part_content = json.load(f)
@@ -25,29 +56,14 @@ def generate_video(input_json_path, clip_generation_mode="normal", part_number=1
         selected_voice = get_random_voice()
     print(f"Selected voice: {selected_voice}")
 
-    def split_into_sentences(text):
-        # Handle common abbreviations
-        text = re.sub(r'(?<=[A-Z])\.(?=[A-Z]\.)', '<PERIOD>', text)
-        text = re.sub(r'(?<=Dr)\.', '<PERIOD>', text)
-        text = re.sub(r'(?<=Mr)\.', '<PERIOD>', text)
-        text = re.sub(r'(?<=Mrs)\.', '<PERIOD>', text)
-        text = re.sub(r'(?<=Ms)\.', '<PERIOD>', text)
-        # Add more abbreviations as needed
-
-        # Split sentences
-        sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', text)
-
-        # Restore periods in abbreviations
-        sentences = [s.replace('<PERIOD>', '.') for s in sentences]
-
-        return [s.strip() for s in sentences if s.strip()]
-
     for paragraph in script_lines:
         sentences = split_into_sentences(paragraph)
         for sentence in sentences:
-            filename = f"outputs/temp_audio_{index}.mp3"
+            filename = os.path.join(audio_dir, f"temp_audio_{index}.mp3")
             try:
-                tts(sentence, selected_voice, filename, 1.30)
+                # Reuse audio synthesized while the script was still streaming in, if there is any
+                if not (prefetcher and prefetcher.fetch(sentence, filename, selected_voice)):
+                    tts(sentence, selected_voice, filename, 1.30)
                 duration = get_duration(filename)
 
                 audio_segments.append((sentence, duration))
@@ -66,33 +82,37 @@ def generate_video(input_json_path, clip_generation_mode="normal", part_number=1
     print("Created audio files for script")
 
     # Write SRT content to file
-    srt_path = f"operation_data/output.srt"
     with open(srt_path, "w") as f:
         f.write(srt_content)
 
     # Merge the audio files into one
-    wav_path = f"operation_data/output.wav"
     try:
-        total_duration = merge_audio_files(wav_path, 0.1)
+        total_duration = merge_audio_files(wav_path, 0.1, input_dir=audio_dir)
         print("Merged audio duration:", total_duration, "seconds")
     except Exception as e:
         print(f"Error merging audio files: {e}")
         return
 
-    # Modify the output filename
-    output_filename = f"outputs/reel_output_p{part_number}.mp4"
+    # Lets the caller checkpoint the audio, so a failed render can be retried without new TTS requests
+    if on_audio_ready:
+        on_audio_ready(srt_path, wav_path, total_duration)
 
     # Create the video
+    if not render_video(total_duration, srt_path, wav_path, cover, output_filename, clip_generation_mode, part_number, temp_data_path):
+        return
+
+    print("Video generation completed successfully!")
+    return selected_voice
+
+def render_video(total_duration, srt_path, wav_path, cover, output_filename, clip_generation_mode="normal", part_number=1, temp_data_path="operation_data"):
+    # Renders a part from its merged audio and subtitles, returns False if rendering failed
     try:
         video_editor = VideoEditor(total_duration, srt_path, wav_path, False, clip_generation_mode=clip_generation_mode, part_number=part_number)
         video_editor.cover_img_url = cover
-        video_editor.start_render(output_filename)
+        return video_editor.start_render(output_filename, temp_data_path)
     except Exception as e:
         print(f"Error rendering video: {e}")
-        return
-
-    print("Video generation completed successfully!")
-    return selected_voice
+        return False
 
 def format_duration(duration):
     hours = int(duration // 3600)
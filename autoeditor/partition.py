@@ -0,0 +1,93 @@
+from .generator import split_into_sentences
+from .prefetch import TTS_SPEED
+
+MAX_PART_SECONDS = 90  # Instagram Reels longer than this are rejected
+SAFETY_MARGIN = 0.9  # Share of MAX_PART_SECONDS a part may be estimated at, the estimate is only approximate
+CHARS_PER_SECOND = 14.0  # Speaking rate of the TTS voices at normal speed
+SENTENCE_GAP = 0.1  # Seconds of silence generate_video puts between sentences
+PART_INTRO = "Part {}."
+CONTINUATION_LINE = "To be continued in the next video"
+
+
+def estimate_speech_seconds(text, speed=TTS_SPEED):
+    return len(text) / (CHARS_PER_SECOND * speed) + SENTENCE_GAP
+
+
+def partition_script(script, max_part_seconds=MAX_PART_SECONDS, speed=TTS_SPEED):
+    """
+    Split a script into as few Reels as possible with balanced spoken durations.
+
+    The script is cut at sentence boundaries. Each part is estimated including its
+    "Part N." intro and, except for the last part, the continuation line, and has
+    to stay under max_part_seconds * SAFETY_MARGIN. Among the partitions with the
+    fewest parts, the one with the smallest sum of squared part durations wins,
+    which is the most even one.
+
+    Prefix sums make each part's duration an O(1) lookup, and only the sentences
+    that fit into one part are considered as its start, so the dynamic program
+    runs in O(n * w) for n sentences and at most w sentences per part.
+
+    Args:
+        script (list): The script lines, each one or more sentences.
+        max_part_seconds (float): The hard duration limit of a Reel.
+        speed (float): The playback speed applied to the TTS audio.
+
+    Returns:
+        list: The parts, each a list of script lines. Sentences of one line stay
+        together on one line unless the line is split between two parts.
+    """
+    units = [(line_index, sentence) for line_index, line in enumerate(script)
+             for sentence in split_into_sentences(line)]
+    if not units:
+        return []
+
+    cap = max_part_seconds * SAFETY_MARGIN
+    # The intro's duration barely depends on the part number, the continuation line is only left out of the last part
+    intro = estimate_speech_seconds(PART_INTRO.format(10), speed)
+    outro = estimate_speech_seconds(CONTINUATION_LINE, speed)
+
+    prefix = [0.0]
+    for _, sentence in units:
+        prefix.append(prefix[-1] + estimate_speech_seconds(sentence, speed))
+
+    n = len(units)
+    # best[j] = (parts, sum of squared durations, start of the last part) for the first j sentences
+    best = [None] * (n + 1)
+    best[0] = (0, 0.0, None)
+    for j in range(1, n + 1):
+        tail = 0.0 if j == n else outro
+        for i in range(j - 1, -1, -1):
+            duration = intro + prefix[j] - prefix[i] + tail
+            # A single sentence longer than the cap still has to go somewhere
+            if duration > cap and i < j - 1:
+                break
+            candidate = (best[i][0] + 1, best[i][1] + duration * duration, i)
+            if best[j] is None or candidate[:2] < best[j][:2]:
+                best[j] = candidate
+
+    boundaries = []
+    j = n
+    while j > 0:
+        i = best[j][2]
+        boundaries.append((i, j))
+        j = i
+    boundaries.reverse()
+
+    parts = []
+    for start, end in boundaries:
+        lines = []
+        previous_line = None
+        for line_index, sentence in units[start:end]:
+            if line_index == previous_line:
+                lines[-1] += " " + sentence
+            else:
+                lines.append(sentence)
+            previous_line = line_index
+        parts.append(lines)
+    return parts
+
+
+def estimate_part_seconds(part, part_number, is_last, speed=TTS_SPEED):
+    # The estimated Reel length of a part, the same way partition_script measures it
+    lines = [PART_INTRO.format(part_number)] + part + ([] if is_last else [CONTINUATION_LINE])
+    return sum(estimate_speech_seconds(sentence, speed) for line in lines for sentence in split_into_sentences(line))
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .tts import tts
+from .generator import split_into_sentences
+
+TTS_SPEED = 1.30  # Must match the speed generate_video uses
+
+
+class TTSPrefetcher:
+    def __init__(self, voice, speed=TTS_SPEED, cache_dir="operation_data/tts_prefetch", max_workers=2):
+        """
+        Synthesizes script lines in the background while the rest of the script is still being generated.
+
+        Pass submit as the on_script_line callback of a streaming GPT call. Each line
+        is split into the same sentences generate_video uses and synthesized on a
+        worker thread. generate_video then copies the finished audio instead of
+        calling the TTS endpoint again.
+
+        Args:
+            voice (str): The TTS voice, it must be the one generate_video will use.
+            speed (float): The playback speed applied to the audio.
+            cache_dir (str): Where prefetched audio files are kept until close().
+            max_workers (int): The number of concurrent TTS requests.
+        """
+        self.voice = voice
+        self.speed = speed
+        self.cache_dir = cache_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, sentence):
+        digest = hashlib.sha256(f"{self.voice}|{self.speed}|{sentence}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.mp3")
+
+    def _synthesize(self, sentence, path):
+        tts(sentence, self.voice, path, self.speed)
+        return os.path.exists(path)
+
+    def submit(self, line):
+        for sentence in split_into_sentences(line):
+            with self._lock:
+                if sentence in self._futures:
+                    continue
+                self._futures[sentence] = self._executor.submit(self._synthesize, sentence, self._path(sentence))
+
+    def fetch(self, sentence, filename, voice):
+        """
+        Copy the prefetched audio for a sentence to filename.
+
+        Waits for the synthesis if it is still running.
+
+        Returns:
+            bool: False if the sentence was not prefetched for this voice or its synthesis failed.
+        """
+        if voice != self.voice:
+            return False
+        with self._lock:
+            future = self._futures.get(sentence)
+        if future is None:
+            return False
+        try:
+            if not future.result():
+                return False
+        except Exception as e:
+            print(f"Prefetched audio for sentence failed: {e}")
+            return False
+        shutil.copyfile(self._path(sentence), filename)
+        return True
+
+    def discard(self, lines):
+        # Cancel the synthesis of lines from a rejected script, finished audio stays for a later script with the same sentences
+        cancelled = 0
+        for line in lines:
+            for sentence in split_into_sentences(line):
+                with self._lock:
+                    future = self._futures.get(sentence)
+                    if future is not None and future.cancel():
+                        del self._futures[sentence]
+                        cancelled += 1
+        if cancelled:
+            print(f"Cancelled {cancelled} prefetched sentences of a rejected script")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -14,6 +14,7 @@ import random
 import threading
 import requests
 import base64
+from rate_limiter import rate_limited_request
 #! Removed playsound import - Krishpkreame
 # from playsound import playsound
 COUNT = 0
@@ -82,7 +83,7 @@ def split_string(string: str, chunk_size: int) -> list[str]:
 
 def get_api_response() -> requests.Response:
     url = f'{ENDPOINTS[current_endpoint].split("/a")[0]}'
-    response = requests.get(url)
+    response = rate_limited_request("tts", "GET", url)
     return response
 
 # saving the audio file
@@ -101,7 +102,7 @@ def generate_audio(text: str, voice: str) -> bytes:
     headers = {'Content-Type': 'application/json'}
     data = {'text': text, 'voice': voice}
     # data = {'text': text, 'voice': voice}
-    response = requests.post(url, headers=headers, json=data)
+    response = rate_limited_request("tts", "POST", url, headers=headers, json=data)
     return response.content
 
 # creates an text to speech audio file
@@ -227,20 +228,21 @@ def get_duration(filename: str) -> float:
 #! Personal Note: Added merge_audio_files function - Krishpkreame
 
 
-def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
+def merge_audio_files(output_file: str, delay: float = 0.1, input_dir: str = "outputs") -> float:
     """
     Merge multiple mp3 audio files into a single audio file with a small delay between each file.
 
     Args:
         output_file (str): The path to save the merged audio file.
         delay (float): The delay in seconds between each audio file. Default is 0.1 seconds.
+        input_dir (str): The directory holding the numbered mp3 files. Default is "outputs".
 
     Returns:
         float: The duration of the merged audio in seconds.
     """
-    # Get all mp3 files in the outputs directory
+    # Get all mp3 files in the input directory
     mp3_files = [file for file in os.listdir(
-        "outputs") if file.endswith(".mp3")]
+        input_dir) if file.endswith(".mp3")]
 
     # Sort the files based on their numerical order
     mp3_files.sort(key=lambda x: tuple(map(int, re.findall(r'\d+', x))))
@@ -251,7 +253,7 @@ def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
     # Iterate over the mp3 files and append them to the merged_audio with a small delay
     for i, file in enumerate(mp3_files):
         audio = AudioSegment.from_file(
-            os.path.join("outputs", file), format="mp3")
+            os.path.join(input_dir, file), format="mp3")
         if i == 0:
             merged_audio += audio
         else:
@@ -260,9 +262,9 @@ def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
     # Export the merged audio as a single wav file
     merged_audio.export(output_file, format="wav")
 
-    # Remove all the mp3 files from the outputs directory
+    # Remove all the mp3 files from the input directory
     for file in mp3_files:
-        os.remove(os.path.join("outputs", file))
+        os.remove(os.path.join(input_dir, file))
 
     # Return the duration of the merged audio in seconds
     return len(merged_audio) / 1000
@@ -0,0 +1,115 @@
+# Compares the single-pass Recall parser with the previous line-splitting parser on synthetic summaries
+# Run from the repository root: python -m benchmarks.parser_benchmark
+import argparse
+import json
+import random
+import re
+import time
+import tracemalloc
+from recall_api.parser import parse_recall_summary
+
+WORDS = ("market growth interest inflation model data training neural energy climate policy startup "
+         "founder revenue customer product launch research study result podcast guest episode").split()
+
+
+def legacy_parse_recall_summary(summary, video_url):
+    # The parser as it was before the single-pass rewrite, kept here as the reference output
+    structured_summary = {
+        "title": summary.get("name", ""),
+        "cover": "",
+        "tags": [],
+        "summary": {},
+        "video_url": video_url
+    }
+
+    images = summary.get("images", [])
+    if images:
+        structured_summary["cover"] = images[0].get("urlOriginal", "")
+
+    links = summary.get("links", [])
+    structured_summary["tags"] = [link.get("item", {}).get("name", "") for link in links if link.get("item", {}).get("name")]
+
+    markdown_content = summary.get("markdown", "")
+    lines = markdown_content.split("\n")
+    current_section = None
+
+    for line in lines:
+        if line.startswith("## "):
+            section_title = line[3:].split(" [(")[0].strip()
+            current_section = section_title
+            structured_summary["summary"][current_section] = []
+        elif line.startswith("- "):
+            bullet_point = line[2:]
+            match = re.search(r'(.*) \[(.*?)\]\((.*?)\)', bullet_point)
+            if match and current_section is not None:
+                text = match.group(1).strip()
+                structured_summary["summary"][current_section].append(text)
+
+    return structured_summary
+
+
+def synthetic_summary(target_bytes, seed=0):
+    # Sections of timestamped bullets with the prose, blank lines and odd lines a long podcast summary has
+    generator = random.Random(seed)
+    lines = ["# Episode summary", ""]
+    size = 0
+    section = 0
+    while size < target_bytes:
+        section += 1
+        lines.append(f"## Section {section} [(00:{section % 60:02d}:00)](https://youtu.be/x?t={section * 60})")
+        for bullet in range(generator.randint(5, 40)):
+            text = " ".join(generator.choice(WORDS) for _ in range(generator.randint(8, 40)))
+            seconds = section * 60 + bullet
+            if bullet % 7 == 3:
+                lines.append(f"- {text} without a timestamp")
+            else:
+                lines.append(f"- {text} [({seconds // 60:02d}:{seconds % 60:02d})](https://youtu.be/x?t={seconds})")
+            if bullet % 11 == 5:
+                lines.append(f"  {text}")
+        lines.append("")
+        size = sum(len(line) + 1 for line in lines)
+    return {
+        "name": "Synthetic podcast",
+        "images": [{"urlOriginal": "https://example.com/cover.jpg"}],
+        "links": [{"item": {"name": f"tag {i}"}} for i in range(20)],
+        "markdown": "\n".join(lines)
+    }
+
+
+def measure(parse, summary, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parse(summary, "https://www.youtube.com/watch?v=xxxxxxxxxxx")
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    parse(summary, "https://www.youtube.com/watch?v=xxxxxxxxxxx")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Recall summary parser")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="Markdown sizes in MB")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per parser, the best one is reported")
+    args = parser.parse_args()
+
+    for size_mb in args.sizes:
+        summary = synthetic_summary(int(size_mb * 1024 * 1024))
+        video_url = "https://www.youtube.com/watch?v=xxxxxxxxxxx"
+        expected = legacy_parse_recall_summary(summary, video_url)
+        actual = parse_recall_summary(summary, video_url)
+        assert json.dumps(actual) == json.dumps(expected), "parsers disagree"
+
+        legacy_time, legacy_peak = measure(legacy_parse_recall_summary, summary, args.repeats)
+        new_time, new_peak = measure(parse_recall_summary, summary, args.repeats)
+        bullets = sum(len(bullets) for bullets in actual["summary"].values())
+        print(f"{size_mb:g} MB, {len(actual['summary'])} sections, {bullets} bullets: "
+              f"legacy {legacy_time * 1000:.1f} ms / {legacy_peak / 1e6:.1f} MB peak, "
+              f"single-pass {new_time * 1000:.1f} ms / {new_peak / 1e6:.1f} MB peak, "
+              f"{legacy_time / new_time:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
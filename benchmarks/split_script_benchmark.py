@@ -0,0 +1,84 @@
+# Compares the duration-aware script partitioner with the previous character-count split on long scripts
+# Run from the repository root: python -m benchmarks.split_script_benchmark
+import argparse
+import random
+import statistics
+import time
+from autoeditor.partition import partition_script, estimate_part_seconds, MAX_PART_SECONDS
+
+WORDS = ("market growth interest inflation model data training neural energy climate policy startup "
+         "founder revenue customer product launch research study result podcast guest episode").split()
+
+
+def legacy_simple_split(arr, char_limit=1150, upper_limit=2100):
+    # split_script's splitter before the partitioner, kept here as the baseline
+    parts = []
+    current_part = []
+    current_length = 0
+
+    for i, element in enumerate(arr):
+        element_length = len(element)
+
+        remaining_length = sum(len(e) for e in arr[i:])
+        if not current_part and char_limit < remaining_length <= upper_limit:
+            middle_index = i + (len(arr[i:]) // 2)
+            parts.append(arr[i:middle_index])
+            parts.append(arr[middle_index:])
+            return parts
+
+        if current_length + element_length > char_limit and current_part:
+            parts.append(current_part)
+            current_part = []
+            current_length = 0
+
+        current_part.append(element)
+        current_length += element_length
+
+    if current_part:
+        parts.append(current_part)
+
+    return parts
+
+
+def synthetic_script(lines, seed=0):
+    # Script lines of one to three sentences, like the GPT output
+    generator = random.Random(seed)
+    script = []
+    for _ in range(lines):
+        sentences = []
+        for _ in range(generator.randint(1, 3)):
+            words = [generator.choice(WORDS) for _ in range(generator.randint(5, 25))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        script.append(" ".join(sentences))
+    return script
+
+
+def describe(parts):
+    durations = [estimate_part_seconds(part, i, i == len(parts)) for i, part in enumerate(parts, 1)]
+    over = sum(1 for duration in durations if duration > MAX_PART_SECONDS)
+    spread = statistics.pstdev(durations) if len(durations) > 1 else 0.0
+    return f"{len(parts)} parts, longest {max(durations):.1f}s, {over} over {MAX_PART_SECONDS}s, stdev {spread:.1f}s"
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark script partitioning")
+    parser.add_argument("--lines", type=int, nargs="+", default=[20, 200, 2000, 20000], help="Script lengths in lines")
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        script = synthetic_script(lines)
+        legacy_parts, legacy_time = timed(legacy_simple_split, script)
+        parts, new_time = timed(partition_script, script)
+        print(f"{lines} lines:")
+        print(f"  legacy      {legacy_time * 1000:9.1f} ms  {describe(legacy_parts)}")
+        print(f"  partitioner {new_time * 1000:9.1f} ms  {describe(parts)}")
+
+
+if __name__ == "__main__":
+    main()
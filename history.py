@@ -0,0 +1,299 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+DEFAULT_HISTORY_INDEX_PATH = "operation_data/cache/video_history.sqlite3"
+BLOOM_CAPACITY = 100000  # Expected number of processed videos, more only raise the false positive rate
+BLOOM_ERROR_RATE = 0.01
+QUERY_CONCURRENCY = 8  # Parallel DynamoDB queries for URLs the local index doesn't know
+NEGATIVE_TTL = 600  # Seconds a "not processed" answer from DynamoDB is trusted
+FLUSH_SIZE = 25  # Pending history writes that trigger a flush, the size of one DynamoDB batch write
+FLUSH_INTERVAL = 30  # Seconds a history write waits at most before it is flushed
+SUMMARY_ENCODING = "gzip+json"
+
+_dynamodb = None
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_dynamodb():
+    # One boto3 resource for the whole process, creating one is slow and it is thread-safe to share
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+
+def compress_summary(enhanced_summary):
+    return gzip.compress(json.dumps(enhanced_summary).encode("utf-8"))
+
+
+def decompress_summary(data):
+    return json.loads(gzip.decompress(bytes(data)).decode("utf-8"))
+
+
+class BloomFilter:
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        """
+        A fixed-size Bloom filter over strings.
+
+        A miss means the string was never added, a hit only means it probably was.
+
+        Args:
+            capacity (int): The number of strings the error rate is sized for.
+            error_rate (float): The false positive rate at capacity.
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: the k positions are derived from the two halves of one digest
+        digest = hashlib.sha256(value.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class VideoHistory:
+    def __init__(self, table_name, index_path=DEFAULT_HISTORY_INDEX_PATH, flush_size=FLUSH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, query_concurrency=QUERY_CONCURRENCY):
+        """
+        The VideoProcessingHistory table behind a local membership index.
+
+        Every video this instance has seen in the table or recorded itself is kept
+        in a SQLite mirror, with a Bloom filter in front of it. A video that is
+        known there is rejected without any network I/O. The remaining candidates
+        are checked together, with parallel queries on the shared boto3 resource.
+
+        New entries go into the mirror right away and are written to DynamoDB
+        behind the caller's back in batches, with the enhanced summary gzip
+        compressed. Entries that were not written yet survive a restart in the
+        mirror and are flushed by the next run.
+
+        Args:
+            table_name (str): The DynamoDB history table.
+            index_path (str): The SQLite file of the local mirror.
+            flush_size (int): The number of pending writes that triggers a flush.
+            flush_interval (float): Seconds a pending write waits at most.
+            query_concurrency (int): The number of DynamoDB queries in flight at once.
+        """
+        self.table_name = table_name
+        self.index_path = index_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.query_concurrency = query_concurrency
+        self.bloom = BloomFilter()
+        self.local_hits = 0
+        self.remote_checks = 0
+        self.written = 0
+        self._checked_new = {}  # video_url -> when DynamoDB last said it wasn't processed
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "table_name TEXT NOT NULL, video_url TEXT NOT NULL, processed_at TEXT NOT NULL, "
+                "synced INTEGER NOT NULL, enhanced_summary BLOB, PRIMARY KEY (table_name, video_url))"
+            )
+            rows = conn.execute("SELECT video_url FROM history WHERE table_name = ?", (table_name,)).fetchall()
+        for video_url, in rows:
+            self.bloom.add(video_url)
+        print(f"Loaded {len(rows)} videos into the local history index for {table_name}")
+        if self.pending():
+            # Entries an earlier run recorded but didn't get to write
+            self._start_flusher()
+
+    def connect(self):
+        # A short-lived connection per call keeps the index safe to use from worker threads
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    @property
+    def table(self):
+        return get_dynamodb().Table(self.table_name)
+
+    def _remember(self, video_url, processed_at, synced, enhanced_summary=None):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO history (table_name, video_url, processed_at, synced, enhanced_summary) VALUES (?, ?, ?, ?, ?)",
+                (self.table_name, video_url, processed_at, synced, enhanced_summary)
+            )
+        with self._lock:
+            self.bloom.add(video_url)
+            self._checked_new.pop(video_url, None)
+
+    def is_known(self, video_url):
+        # Local only: the Bloom filter rules most new videos out, the mirror confirms its hits
+        with self._lock:
+            if video_url not in self.bloom:
+                return False
+        with self.connect() as conn:
+            row = conn.execute("SELECT 1 FROM history WHERE table_name = ? AND video_url = ?",
+                               (self.table_name, video_url)).fetchone()
+        return row is not None
+
+    def _query(self, video_url):
+        # processed_at is the sort key, so a video's entries can only be looked up with a query on the partition key
+        response = self.table.query(
+            KeyConditionExpression=Key('video_url').eq(video_url),
+            ProjectionExpression='video_url, processed_at',
+            ScanIndexForward=False,
+            Limit=1
+        )
+        items = response.get('Items', [])
+        return items[0]['processed_at'] if items else None
+
+    async def check_many(self, video_urls):
+        """
+        Find the videos among video_urls that are already in the history.
+
+        Known videos and videos DynamoDB reported as new within NEGATIVE_TTL are
+        answered locally. Only the rest is queried, query_concurrency at a time.
+
+        Returns:
+            set: The URLs of the already processed videos.
+        """
+        processed = set()
+        unknown = []
+        now = time.monotonic()
+        for video_url in dict.fromkeys(video_urls):
+            if await asyncio.to_thread(self.is_known, video_url):
+                processed.add(video_url)
+                self.local_hits += 1
+            elif now - self._checked_new.get(video_url, float("-inf")) > NEGATIVE_TTL:
+                unknown.append(video_url)
+
+        semaphore = asyncio.Semaphore(self.query_concurrency)
+
+        async def check_remote(video_url):
+            async with semaphore:
+                self.remote_checks += 1
+                try:
+                    processed_at = await asyncio.to_thread(self._query, video_url)
+                except ClientError as e:
+                    print(f"Error checking video history in DynamoDB: {e}")
+                    return
+            if processed_at:
+                print(f"Found existing entry for video: {video_url}")
+                print(f"Processed at: {processed_at}")
+                await asyncio.to_thread(self._remember, video_url, processed_at, 1)
+                processed.add(video_url)
+            else:
+                self._checked_new[video_url] = time.monotonic()
+
+        await asyncio.gather(*[check_remote(video_url) for video_url in unknown])
+        return processed
+
+    async def check(self, video_url):
+        return video_url in await self.check_many([video_url])
+
+    def add(self, video_url, enhanced_summary):
+        # Recorded locally at once, written to DynamoDB by the next flush
+        self._remember(video_url, datetime.now().isoformat(), 0, compress_summary(enhanced_summary))
+        print(f"Added video history for: {video_url}")
+        self._start_flusher()
+        if self.pending() >= self.flush_size:
+            self.flush()
+
+    def pending(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM history WHERE table_name = ? AND synced = 0",
+                                (self.table_name,)).fetchone()[0]
+
+    def flush(self):
+        """
+        Write the pending history entries to DynamoDB with a batch writer.
+
+        Entries stay pending if the write fails and are retried by the next flush.
+
+        Returns:
+            int: The number of entries written.
+        """
+        with self._flush_lock:
+            with self.connect() as conn:
+                rows = conn.execute(
+                    "SELECT video_url, processed_at, enhanced_summary FROM history WHERE table_name = ? AND synced = 0",
+                    (self.table_name,)
+                ).fetchall()
+            if not rows:
+                return 0
+            try:
+                # The batch writer sends 25 items per request and resends unprocessed ones
+                with self.table.batch_writer(overwrite_by_pkeys=['video_url', 'processed_at']) as batch:
+                    for video_url, processed_at, enhanced_summary in rows:
+                        batch.put_item(Item={
+                            'video_url': video_url,
+                            'processed_at': processed_at,
+                            'enhanced_summary': bytes(enhanced_summary),
+                            'summary_encoding': SUMMARY_ENCODING
+                        })
+            except Exception as e:
+                print(f"Error adding video history to DynamoDB: {e}")
+                return 0
+            with self.connect() as conn:
+                # Only the mirror's membership is needed from now on, drop the summary
+                conn.executemany(
+                    "UPDATE history SET synced = 1, enhanced_summary = NULL WHERE table_name = ? AND video_url = ?",
+                    [(self.table_name, video_url) for video_url, _, _ in rows]
+                )
+            self.written += len(rows)
+            print(f"Wrote {len(rows)} video history entries to {self.table_name}")
+            return len(rows)
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+                self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        # Stop the background flusher and write whatever is still pending
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        self._stop.clear()
+
+    def report(self):
+        print(f"Video history {self.table_name}: {self.local_hits} answered locally, "
+              f"{self.remote_checks} DynamoDB queries, {self.written} entries written, {self.pending()} pending")
+
+
+def get_video_history(table_name):
+    # One VideoHistory per table, shared by every pipeline stage
+    with _histories_lock:
+        if table_name not in _histories:
+            _histories[table_name] = VideoHistory(table_name)
+        return _histories[table_name]
+
+
+def close_video_histories():
+    for history in list(_histories.values()):
+        history.close()
+        history.report()
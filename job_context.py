@@ -0,0 +1,71 @@
+import json
+import os
+import re
+import shutil
+from recall_api.cache import normalize_video_id
+
+JOBS_ROOT = "operation_data/jobs"
+
+
+class JobContext:
+    def __init__(self, video_url, root=JOBS_ROOT):
+        """
+        Everything one video job reads and writes, so several jobs can run side by side.
+
+        Each job gets its own workspace directory under root, named after the video
+        ID, and keeps its summaries in memory instead of re-reading shared files.
+        Per-part files (script, audio, subtitles, rendered video) live in a
+        subdirectory per part.
+
+        Args:
+            video_url (str): The YouTube video the job turns into Reels.
+            root (str): The directory workspaces are created in.
+        """
+        self.video_url = video_url
+        self.video_id = normalize_video_id(video_url)
+        self.workspace = os.path.join(root, re.sub(r'[^A-Za-z0-9_-]', '_', self.video_id))
+        self.structured_summary = None
+        self.enhanced_summary = None
+        os.makedirs(self.workspace, exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.workspace, *parts)
+
+    def part_dir(self, part_number):
+        directory = self.path(f"part_{part_number}")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def audio_dir(self, part_number):
+        directory = os.path.join(self.part_dir(part_number), "audio")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def script_path(self, part_number):
+        return os.path.join(self.part_dir(part_number), "script.json")
+
+    def srt_path(self, part_number):
+        return os.path.join(self.part_dir(part_number), "output.srt")
+
+    def wav_path(self, part_number):
+        return os.path.join(self.part_dir(part_number), "output.wav")
+
+    def video_path(self, part_number):
+        return os.path.join(self.part_dir(part_number), f"reel_output_p{part_number}.mp4")
+
+    def set_summaries(self, structured_summary=None, enhanced_summary=None):
+        # Kept in memory for the rest of the job, the files are only written for inspection
+        if structured_summary is not None:
+            self.structured_summary = structured_summary
+            with open(self.path("structured_summary.json"), "w") as f:
+                json.dump(structured_summary, f, indent=2)
+        if enhanced_summary is not None:
+            self.enhanced_summary = enhanced_summary
+            with open(self.path("enhanced_summary.json"), "w") as f:
+                json.dump(enhanced_summary, f, indent=2)
+
+    def cleanup(self):
+        # Remove the per-part audio, subtitles and videos, the summaries are kept for inspection
+        for entry in os.listdir(self.workspace):
+            if entry.startswith("part_"):
+                shutil.rmtree(self.path(entry), ignore_errors=True)
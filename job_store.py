@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_JOB_STORE_PATH = "operation_data/jobs/jobs.sqlite3"
+MAX_ATTEMPTS = 3  # A job or part that failed this many times is given up on
+
+# Stages in the order they complete, a record's stage is the last one it completed
+JOB_STAGES = ("queued", "summarized", "recorded", "done")
+PART_STAGES = ("split", "audio", "rendered", "uploaded", "container_created", "published")
+FINAL_JOB_STAGES = ("done", "skipped", "failed")
+
+JOB_COLUMNS = ("stage", "attempts", "settings", "selected_voice", "structured_summary", "enhanced_summary", "error")
+PART_COLUMNS = ("stage", "attempts", "content", "srt_path", "wav_path", "audio_duration", "video_path",
+                "s3_key", "s3_video_url", "ig_container_id", "error")
+JSON_COLUMNS = ("settings", "structured_summary", "enhanced_summary", "content")
+
+
+def stage_reached(stage, target, stages=PART_STAGES):
+    return stage in stages and stages.index(stage) >= stages.index(target)
+
+
+class JobStore:
+    def __init__(self, path=DEFAULT_JOB_STORE_PATH):
+        """
+        SQLite checkpoints of every video job and its parts.
+
+        Each stage's output is written as soon as the stage completes: the
+        summaries, the split parts, the merged audio and subtitles, the rendered
+        file, the S3 key and the Instagram container ID. After a crash the pipeline
+        reads them back and continues every unfinished job from its last completed
+        stage, so paid Recall, GPT and TTS work is not repeated and parts of a video
+        that is already in the history are not lost.
+
+        Args:
+            path (str): The SQLite database file.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "video_url TEXT PRIMARY KEY, stage TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "settings TEXT, selected_voice TEXT, structured_summary TEXT, enhanced_summary TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parts ("
+                "video_url TEXT NOT NULL, part_number INTEGER NOT NULL, stage TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, content TEXT, srt_path TEXT, wav_path TEXT, audio_duration REAL, "
+                "video_path TEXT, s3_key TEXT, s3_video_url TEXT, ig_container_id TEXT, error TEXT, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (video_url, part_number))"
+            )
+
+    def connect(self):
+        # A short-lived connection per call keeps the store safe to use from worker threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _decode(row):
+        if row is None:
+            return None
+        record = dict(row)
+        for column in JSON_COLUMNS:
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+        return record
+
+    @staticmethod
+    def _assignments(fields, allowed):
+        unknown = set(fields) - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown job store columns: {', '.join(sorted(unknown))}")
+        values = [json.dumps(value) if column in JSON_COLUMNS and value is not None else value
+                  for column, value in fields.items()]
+        return ", ".join(f"{column} = ?" for column in fields), values
+
+    def get_job(self, video_url):
+        with self.connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE video_url = ?", (video_url,)).fetchone()
+        return self._decode(row)
+
+    def create_job(self, video_url, settings):
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (video_url, stage, settings, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (video_url, json.dumps(settings), now, now)
+            )
+
+    def update_job(self, video_url, **fields):
+        assignments, values = self._assignments(fields, JOB_COLUMNS)
+        with self.connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments}, updated_at = ? WHERE video_url = ?",
+                         values + [time.time(), video_url])
+
+    def record_job_failure(self, video_url, error):
+        # Returns True once the job has used up its attempts and is marked failed
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, updated_at = ?, "
+                "stage = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE stage END WHERE video_url = ?",
+                (str(error), time.time(), MAX_ATTEMPTS, video_url)
+            )
+            row = conn.execute("SELECT stage FROM jobs WHERE video_url = ?", (video_url,)).fetchone()
+        return row is not None and row["stage"] == "failed"
+
+    def unfinished_jobs(self):
+        placeholders = ", ".join("?" for _ in FINAL_JOB_STAGES)
+        with self.connect() as conn:
+            rows = conn.execute(f"SELECT * FROM jobs WHERE stage NOT IN ({placeholders}) ORDER BY created_at",
+                                FINAL_JOB_STAGES).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def add_parts(self, video_url, contents):
+        # Parts are written together with the job's move to 'recorded', so a restart never sees half of them
+        now = time.time()
+        with self.connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO parts (video_url, part_number, stage, content, updated_at) VALUES (?, ?, 'split', ?, ?)",
+                [(video_url, part_number, json.dumps(content), now) for part_number, content in enumerate(contents, 1)]
+            )
+            conn.execute("UPDATE jobs SET stage = 'recorded', updated_at = ? WHERE video_url = ?", (now, video_url))
+
+    def get_parts(self, video_url):
+        with self.connect() as conn:
+            rows = conn.execute("SELECT * FROM parts WHERE video_url = ? ORDER BY part_number", (video_url,)).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def update_part(self, video_url, part_number, **fields):
+        assignments, values = self._assignments(fields, PART_COLUMNS)
+        with self.connect() as conn:
+            conn.execute(f"UPDATE parts SET {assignments}, updated_at = ? WHERE video_url = ? AND part_number = ?",
+                         values + [time.time(), video_url, part_number])
+
+    def record_part_failure(self, video_url, part_number, error):
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE parts SET attempts = attempts + 1, error = ?, updated_at = ? WHERE video_url = ? AND part_number = ?",
+                (str(error), time.time(), video_url, part_number)
+            )
+
+    @staticmethod
+    def part_is_final(part):
+        return part["stage"] == "published" or part["attempts"] >= MAX_ATTEMPTS
+
+    def complete_if_finished(self, video_url):
+        # Marks the job done once every part is published or out of attempts
+        parts = self.get_parts(video_url)
+        if parts and all(self.part_is_final(part) for part in parts):
+            self.update_job(video_url, stage="done")
+            return True
+        return False
@@ -1,3 +1,14 @@
-from .search import get_top_videos
+from .search import get_top_videos, get_top_video_records, find_top_video
+from .ranking import TopK
+from .channel_id import ChannelIdResolver, resolve_monitor_list
+from .registry import get_channel_ids
+from .daemon import MonitorDaemon
+from .websub import WebSubReceiver
+from .sharding import HashRing, ShardCoordinator, MembershipStore, SQLiteMembershipStore
+from .http_pool import HttpPool
+from .feed_cache import FeedCache
+from .feed_state import FeedStateStore
+from .views import ViewCountProvider, YouTubeApiViewCountProvider, WatchPageViewCountProvider, FallbackViewCountProvider, StaticViewCountProvider
 
-__all__ = ['get_top_videos']
+__all__ = ['get_top_videos', 'get_channel_ids', 'MonitorDaemon', 'WebSubReceiver', 'HashRing', 'ShardCoordinator', 'MembershipStore', 'SQLiteMembershipStore', 'get_top_video_records', 'find_top_video', 'TopK', 'ChannelIdResolver', 'resolve_monitor_list', 'HttpPool', 'FeedCache', 'FeedStateStore', 'ViewCountProvider', 'YouTubeApiViewCountProvider',
+           'WatchPageViewCountProvider', 'FallbackViewCountProvider', 'StaticViewCountProvider']
@@ -1,19 +1,42 @@
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
+from rate_limiter import rate_limiter
+import asyncio
+import json
 import os
+import re
+import threading
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variable
-api_key = os.getenv("YOUTUBE_API_KEY")
+DEFAULT_MONITOR_LIST_PATH = "monitor/monitor_list.txt"
+DEFAULT_CHANNEL_ID_CACHE_PATH = "operation_data/cache/channel_ids.json"
+MAX_CONCURRENT_LOOKUPS = 8
+
+# Matches "Channel: name, id" (the README format) and "Channel: name, ID: id" (what main() prints)
+CHANNEL_LINE_PATTERN = re.compile(r'^Channel:\s*(?P<name>.+?)\s*,\s*(?:ID:\s*)?(?P<id>UC[\w-]{22})\s*$')
+
+_thread_local = threading.local()
+
+
+def build_youtube_client(api_key=None):
+    # Get API key from environment variable
+    return build('youtube', 'v3', developerKey=api_key or os.getenv("YOUTUBE_API_KEY"))
+
+
+def get_youtube_client():
+    # googleapiclient clients are not thread-safe, so each worker thread gets its own
+    if getattr(_thread_local, "youtube", None) is None:
+        _thread_local.youtube = build_youtube_client()
+    return _thread_local.youtube
 
-# Create a YouTube API client
-youtube = build('youtube', 'v3', developerKey=api_key)
 
 def get_channel_id(channel_name):
+    # Each search.list call costs 100 quota units
+    rate_limiter.acquire("youtube")
     try:
-        search_response = youtube.search().list(
+        search_response = get_youtube_client().search().list(
             q=channel_name,
             type='channel',
             part='id',
@@ -28,18 +51,98 @@ def get_channel_id(channel_name):
         print(f"Error fetching channel ID for {channel_name}: {e}")
         return None
 
-# Read channel names from monitor_list.txt
-with open('monitor/monitor_list.txt', 'r') as file:
-    channel_names = [line.strip() for line in file if line.strip()]
 
-# Get channel IDs
-channel_ids = {}
-for name in channel_names:
-    channel_id = get_channel_id(name)
-    if channel_id:
-        channel_ids[name] = channel_id
+def parse_monitor_line(line):
+    # Returns (channel name, channel ID or None) for one line of the monitor list
+    line = line.strip()
+    match = CHANNEL_LINE_PATTERN.match(line)
+    if match:
+        return match.group('name'), match.group('id')
+    if line.startswith("Channel:"):
+        line = line[len("Channel:"):].strip()
+    return line, None
+
+
+def read_monitor_list(path=DEFAULT_MONITOR_LIST_PATH):
+    with open(path, 'r') as file:
+        return [parse_monitor_line(line) for line in file if line.strip()]
+
+
+class ChannelIdResolver:
+    def __init__(self, cache_path=DEFAULT_CHANNEL_ID_CACHE_PATH, max_concurrent_lookups=MAX_CONCURRENT_LOOKUPS):
+        """
+        Resolves channel names to channel IDs with a persistent name -> ID cache.
+
+        Entries that already carry an ID and names found in the cache cost nothing.
+        Only the remaining names are searched, concurrently, through the YouTube API.
+
+        Args:
+            cache_path (str): The path to the JSON file backing the cache.
+            max_concurrent_lookups (int): The maximum number of search calls in flight.
+        """
+        self.cache_path = cache_path
+        self.max_concurrent_lookups = max_concurrent_lookups
+        self.cache = {}
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable channel ID cache {cache_path}: {e}")
+
+    async def resolve(self, entries):
+        """
+        Resolve a list of (name, ID or None) entries, as returned by read_monitor_list.
+
+        Returns:
+            dict: Channel name -> channel ID for every entry that could be resolved.
+        """
+        channel_ids = {}
+        misses = []
+        for name, channel_id in entries:
+            if channel_id:
+                self.cache[name] = channel_id
+                channel_ids[name] = channel_id
+            elif name in self.cache:
+                channel_ids[name] = self.cache[name]
+            else:
+                misses.append(name)
+
+        print(f"Resolving {len(misses)} of {len(entries)} channels through the YouTube API")
+        semaphore = asyncio.Semaphore(self.max_concurrent_lookups)
+
+        async def lookup(name):
+            async with semaphore:
+                return name, await asyncio.to_thread(get_channel_id, name)
+
+        for name, channel_id in await asyncio.gather(*[lookup(name) for name in dict.fromkeys(misses)]):
+            if channel_id:
+                self.cache[name] = channel_id
+                channel_ids[name] = channel_id
+            else:
+                print(f"Could not find channel ID for: {name}")
+
+        self.save()
+        return channel_ids
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.cache, f, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+
+async def resolve_monitor_list(path=DEFAULT_MONITOR_LIST_PATH, resolver=None):
+    resolver = resolver or ChannelIdResolver()
+    return await resolver.resolve(read_monitor_list(path))
+
+
+def main():
+    channel_ids = asyncio.run(resolve_monitor_list())
+    for name, channel_id in channel_ids.items():
         print(f"Channel: {name}, ID: {channel_id}")
-    else:
-        print(f"Could not find channel ID for: {name}")
 
-# You can now use the channel_ids dictionary for further processing
+
+if __name__ == "__main__":
+    main()
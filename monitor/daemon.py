@@ -0,0 +1,238 @@
+import asyncio
+import heapq
+import inspect
+import time
+from datetime import datetime, timedelta, timezone
+import aiohttp
+from .http_pool import HttpPool
+from .feed_cache import FeedCache
+from .feed_state import FeedStateStore
+from .ranking import make_video_record
+from .search import fetch_feed_entries
+from .views import default_view_count_provider
+
+MIN_POLL_INTERVAL = 5 * 60  # Hot channels are polled every 5 minutes at most
+MAX_POLL_INTERVAL = 8 * 3600  # Dormant channels are still polled three times a day
+POLLS_PER_UPLOAD = 4  # How many polls to spend on a channel's typical gap between uploads
+CADENCE_WINDOW = 10  # Number of recent uploads used to learn a channel's cadence
+MAX_CONCURRENT_POLLS = 20
+SAVE_INTERVAL = 60  # Seconds between writes of the feed cache and feed state
+CHANNEL_REFRESH_INTERVAL = 3600  # Seconds between reloads of the channel list
+
+
+def estimate_poll_interval(publish_times, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL):
+    """
+    Derive a channel's poll interval from the publish times of its recent uploads.
+
+    Args:
+        publish_times (list): Publish datetimes of the channel's uploads.
+        min_interval (float): The shortest allowed interval in seconds.
+        max_interval (float): The longest allowed interval in seconds.
+
+    Returns:
+        float: The number of seconds to wait before polling the channel again.
+    """
+    recent = sorted(publish_times, reverse=True)[:CADENCE_WINDOW]
+    if len(recent) < 2:
+        return max_interval
+
+    gaps = [(newer - older).total_seconds() for newer, older in zip(recent, recent[1:])]
+    mean_gap = sum(gaps) / len(gaps)
+
+    # A channel that has gone quiet for longer than its usual gap is treated as slower
+    since_last_upload = (datetime.now(timezone.utc) - recent[0]).total_seconds()
+    cadence = max(mean_gap, since_last_upload / 2)
+    return min(max(cadence / POLLS_PER_UPLOAD, min_interval), max_interval)
+
+
+class MonitorDaemon:
+    def __init__(self, channel_ids, on_new_video, hours_ago=24, pool=None, feed_cache=None, feed_state=None,
+                 view_count_provider=None, channel_source=None, min_interval=MIN_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL, max_concurrent_polls=MAX_CONCURRENT_POLLS):
+        """
+        Resident monitor that polls each channel on its own learned schedule.
+
+        Channels wait on a priority queue ordered by their next poll time. After each
+        poll a channel's interval is re-estimated from its upload cadence, so active
+        channels come back within minutes and dormant ones a few times a day. Videos
+        that were not seen before are handed to on_new_video right away. The HTTP pool,
+        feed cache and feed state stay warm between polls.
+
+        On the first poll of a channel that has no stored state, its current videos
+        are recorded without being dispatched, so starting the daemon does not replay
+        every channel's back catalogue into the pipeline.
+
+        Args:
+            channel_ids (list): The channel IDs to monitor.
+            on_new_video (callable): Called (or awaited) with a video record for every new video.
+            hours_ago (int): Only videos published within this many hours are dispatched.
+            pool (HttpPool): The shared HTTP pool. One is created if not given.
+            feed_cache (FeedCache): The conditional GET cache for channel feeds.
+            feed_state (FeedStateStore): The per-channel record of seen videos.
+            view_count_provider (ViewCountProvider): Looks up view counts for new videos.
+            channel_source (callable): Async callable returning the current channel IDs, reloaded periodically.
+            min_interval (float): The shortest poll interval in seconds.
+            max_interval (float): The longest poll interval in seconds.
+            max_concurrent_polls (int): The maximum number of channels polled at once.
+        """
+        self.on_new_video = on_new_video
+        self.hours_ago = hours_ago
+        self.pool = pool or HttpPool()
+        self.feed_cache = feed_cache or FeedCache()
+        self.feed_state = feed_state or FeedStateStore()
+        self.view_count_provider = view_count_provider or default_view_count_provider(self.pool)
+        self.channel_source = channel_source
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.semaphore = asyncio.Semaphore(max_concurrent_polls)
+
+        self.channel_ids = set()
+        self.poll_intervals = {}
+        self.next_poll = {}
+        self._in_flight = set()
+        self._repoll = set()
+        self._polls = set()
+        self._schedule = []
+        self._wake = asyncio.Event()
+        self._stopped = False
+        self.set_channels(channel_ids)
+
+    def set_channels(self, channel_ids):
+        # New channels are polled right away, removed ones drop out when they reach the top of the queue
+        now = time.monotonic()
+        added = set(channel_ids) - self.channel_ids
+        self.channel_ids = set(channel_ids)
+        for channel_id in added:
+            self.schedule(channel_id, now)
+        if added:
+            print(f"Monitoring {len(self.channel_ids)} channels ({len(added)} added)")
+
+    def schedule(self, channel_id, when):
+        # Older heap entries for the channel become stale and are skipped when popped
+        self.next_poll[channel_id] = when
+        heapq.heappush(self._schedule, (when, channel_id))
+        self._wake.set()
+
+    def poll_now(self, channel_id):
+        # Move a channel to the front of the queue, e.g. after a push notification
+        if channel_id not in self.channel_ids:
+            return
+        if channel_id in self._in_flight:
+            self._repoll.add(channel_id)
+        else:
+            self.schedule(channel_id, time.monotonic())
+
+    async def dispatch(self, record):
+        result = self.on_new_video(record)
+        if inspect.isawaitable(result):
+            await result
+
+    async def poll_channel(self, channel_id):
+        self._in_flight.add(channel_id)
+        interval = None
+        try:
+            async with self.semaphore:
+                first_poll = channel_id not in self.feed_state.channels
+                try:
+                    entries = await fetch_feed_entries(channel_id, self.pool, self.feed_cache)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Error polling channel ID {channel_id}: {e!r}")
+                    entries = None
+
+                if entries is not None:
+                    time_threshold = datetime.now(timezone.utc) - timedelta(hours=self.hours_ago)
+                    recent = [entry for entry in entries if entry['published_at'] > time_threshold]
+                    new_videos = self.feed_state.observe(channel_id, recent)
+                    if new_videos and not first_poll:
+                        await self.dispatch_new_videos(channel_id, new_videos)
+                    interval = estimate_poll_interval([entry['published_at'] for entry in entries],
+                                                      self.min_interval, self.max_interval)
+        except Exception as e:
+            # One bad feed entry or failing callback must not stop the daemon or the other channels
+            print(f"Error handling channel ID {channel_id}: {e!r}")
+            import traceback
+            traceback.print_exc()  # This will print the full stack trace
+        finally:
+            if interval is None:
+                # Back off on errors, but not further than the dormant interval
+                interval = min(self.poll_intervals.get(channel_id, self.min_interval) * 2, self.max_interval)
+            self.poll_intervals[channel_id] = interval
+            self._in_flight.discard(channel_id)
+            if channel_id in self._repoll:
+                self._repoll.discard(channel_id)
+                interval = 0
+            self.schedule(channel_id, time.monotonic() + interval)
+
+    async def handle_pushed_videos(self, channel_id, videos):
+        # Entry point for push notifications (see monitor.websub); polling stays as the fallback
+        if channel_id not in self.channel_ids:
+            return
+        time_threshold = datetime.now(timezone.utc) - timedelta(hours=self.hours_ago)
+        new_videos = self.feed_state.observe(channel_id, [video for video in videos if video['published_at'] > time_threshold])
+        if new_videos:
+            await self.dispatch_new_videos(channel_id, new_videos)
+
+    async def dispatch_new_videos(self, channel_id, new_videos):
+        view_counts = await self.view_count_provider.get_view_counts([video['id'] for video in new_videos])
+        self.feed_state.update_views(channel_id, view_counts)
+        for video in new_videos:
+            record = make_video_record(channel_id, video, view_counts.get(video['id'], 0))
+            print(f"New video from channel ID {channel_id}: {record['url']}")
+            await self.dispatch(record)
+
+    async def refresh_channels(self):
+        try:
+            self.set_channels(await self.channel_source())
+        except Exception as e:
+            print(f"Error reloading the channel list: {e}")
+
+    def save_state(self):
+        self.feed_cache.save()
+        self.feed_state.save()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    async def run(self):
+        print(f"Starting monitor daemon for {len(self.channel_ids)} channels")
+        last_save = last_refresh = time.monotonic()
+        try:
+            while not self._stopped:
+                now = time.monotonic()
+                if self.channel_source and now - last_refresh >= CHANNEL_REFRESH_INTERVAL:
+                    await self.refresh_channels()
+                    last_refresh = now
+
+                # Each poll runs as its own task, capped by the semaphore, so a slow feed never holds up channels that come due later
+                while self._schedule and self._schedule[0][0] <= now:
+                    when, channel_id = heapq.heappop(self._schedule)
+                    if channel_id not in self.channel_ids or self.next_poll.get(channel_id) != when:
+                        continue
+                    if channel_id in self._in_flight:
+                        self._repoll.add(channel_id)
+                        continue
+                    self._in_flight.add(channel_id)
+                    task = asyncio.create_task(self.poll_channel(channel_id))
+                    self._polls.add(task)
+                    task.add_done_callback(self._polls.discard)
+
+                if time.monotonic() - last_save >= SAVE_INTERVAL:
+                    self.save_state()
+                    last_save = time.monotonic()
+
+                # Sleep until the next channel is due or something is scheduled earlier
+                self._wake.clear()
+                delay = self._schedule[0][0] - time.monotonic() if self._schedule else self.max_interval
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=min(delay, SAVE_INTERVAL))
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for task in list(self._polls):
+                task.cancel()
+            await asyncio.gather(*self._polls, return_exceptions=True)
+            self.save_state()
+            self.feed_cache.report()
+            await self.pool.close()
@@ -0,0 +1,71 @@
+import json
+import os
+from datetime import datetime
+
+DEFAULT_FEED_CACHE_PATH = "operation_data/cache/feeds.json"
+
+
+class FeedCache:
+    def __init__(self, path=DEFAULT_FEED_CACHE_PATH):
+        """
+        On-disk cache of channel RSS feeds for conditional GET requests.
+
+        For each channel ID the cache keeps the ETag and Last-Modified validators
+        returned by YouTube together with the already parsed feed entries, so an
+        unchanged feed costs a 304 response and no feedparser work.
+
+        Args:
+            path (str): The path to the JSON file backing the cache.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.feeds = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.feeds = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable feed cache {path}: {e}")
+
+    def request_headers(self, channel_id):
+        # Build the conditional GET headers for a channel's feed
+        cached = self.feeds.get(channel_id)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def get_entries(self, channel_id):
+        # Called on a 304 response: serve the parsed entries from the cache
+        cached = self.feeds.get(channel_id)
+        if cached is None:
+            return None
+        self.hits += 1
+        return [dict(entry, published_at=datetime.fromisoformat(entry["published_at"]))
+                for entry in cached["entries"]]
+
+    def store(self, channel_id, response_headers, entries):
+        # Called on a 200 response with the freshly parsed entries
+        self.misses += 1
+        self.feeds[channel_id] = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "entries": [dict(entry, published_at=entry["published_at"].isoformat()) for entry in entries]
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.feeds, f)
+        os.replace(temp_path, self.path)
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        print(f"Feed cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% served from cache)")
@@ -0,0 +1,109 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_FEED_STATE_PATH = "operation_data/cache/feed_state.json"
+VIEW_COUNT_TTL = 3600  # Seconds before a cached view count is fetched again
+RETENTION_HOURS = 24 * 7  # Videos older than this are dropped from the state
+
+
+class FeedStateStore:
+    def __init__(self, path=DEFAULT_FEED_STATE_PATH, view_count_ttl=VIEW_COUNT_TTL, retention_hours=RETENTION_HOURS):
+        """
+        Persistent per-channel record of the videos the monitor has already seen.
+
+        For every channel ID the store keeps the seen video IDs with their title,
+        publish time, last view count and when that count was fetched, so a run
+        only has to look at new entries and at view counts older than the TTL.
+
+        Args:
+            path (str): The path to the JSON file backing the store.
+            view_count_ttl (float): Seconds a cached view count stays fresh.
+            retention_hours (float): How long a seen video is remembered.
+        """
+        self.path = path
+        self.view_count_ttl = view_count_ttl
+        self.retention_hours = retention_hours
+        self.channels = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.channels = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable feed state {path}: {e}")
+
+    def observe(self, channel_id, videos):
+        """
+        Record the entries of a channel's feed and return only the ones not seen before.
+
+        Args:
+            channel_id (str): The YouTube channel ID.
+            videos (list): Video dicts with 'id', 'title', 'published_at' and 'url'.
+
+        Returns:
+            list: The videos that were not in the store yet.
+        """
+        seen = self.channels.setdefault(channel_id, {})
+        new_videos = []
+        for video in videos:
+            if video['id'] in seen:
+                continue
+            seen[video['id']] = {
+                'title': video['title'],
+                'published_at': video['published_at'].isoformat(),
+                'url': video['url'],
+                'views': None,
+                'views_fetched_at': None
+            }
+            new_videos.append(video)
+        return new_videos
+
+    def cached_views(self, channel_id, video_id, now=None):
+        # Returns the cached view count, or None when it is missing or older than the TTL
+        record = self.channels.get(channel_id, {}).get(video_id)
+        if not record or record['views'] is None or not record['views_fetched_at']:
+            return None
+        now = now or datetime.now(timezone.utc)
+        fetched_at = datetime.fromisoformat(record['views_fetched_at'])
+        if (now - fetched_at).total_seconds() > self.view_count_ttl:
+            return None
+        return record['views']
+
+    def last_views(self, channel_id, video_id):
+        record = self.channels.get(channel_id, {}).get(video_id)
+        return record['views'] if record else None
+
+    def stale_video_ids(self, channel_id, videos, now=None):
+        # The videos whose view count has to be (re)fetched in this run
+        return [video['id'] for video in videos if self.cached_views(channel_id, video['id'], now) is None]
+
+    def update_views(self, channel_id, view_counts, now=None):
+        now = (now or datetime.now(timezone.utc)).isoformat()
+        seen = self.channels.get(channel_id, {})
+        for video_id, views in view_counts.items():
+            if video_id in seen:
+                seen[video_id]['views'] = views
+                seen[video_id]['views_fetched_at'] = now
+
+    def publish_times(self, channel_id):
+        # Publish times of the remembered videos of a channel, newest first
+        seen = self.channels.get(channel_id, {})
+        return sorted((datetime.fromisoformat(record['published_at']) for record in seen.values()), reverse=True)
+
+    def prune(self, now=None):
+        # Forget videos that are older than the retention window
+        now = now or datetime.now(timezone.utc)
+        threshold = now - timedelta(hours=self.retention_hours)
+        for channel_id, seen in self.channels.items():
+            self.channels[channel_id] = {
+                video_id: record for video_id, record in seen.items()
+                if datetime.fromisoformat(record['published_at']) > threshold
+            }
+
+    def save(self):
+        self.prune()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.channels, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,101 @@
+import aiohttp
+from contextlib import asynccontextmanager
+from rate_limiter import rate_limiter
+
+# Default limits for the shared HTTP pool used by the monitor
+MAX_CONNECTIONS = 100  # Total open connections across all hosts
+MAX_CONNECTIONS_PER_HOST = 10  # Open connections to a single host (e.g. www.youtube.com)
+REQUEST_TIMEOUT = 30  # Seconds allowed for a whole request, including reading the body
+CONNECT_TIMEOUT = 10  # Seconds allowed to establish a connection
+DNS_CACHE_TTL = 300  # Seconds to cache resolved host names
+KEEPALIVE_TIMEOUT = 60  # Seconds to keep an idle connection open for reuse
+RATE_LIMIT_SERVICE = "youtube_web"  # The monitor pool mostly talks to www.youtube.com
+
+
+class HttpPool:
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_connections_per_host=MAX_CONNECTIONS_PER_HOST,
+                 request_timeout=REQUEST_TIMEOUT, connect_timeout=CONNECT_TIMEOUT,
+                 dns_cache_ttl=DNS_CACHE_TTL, keepalive_timeout=KEEPALIVE_TIMEOUT, rate_limit_service=RATE_LIMIT_SERVICE):
+        """
+        A shared aiohttp session with keep-alive connection pooling and DNS caching.
+
+        The connector caps the number of concurrent connections globally and per host,
+        so callers can fan out freely and requests queue up inside the pool instead of
+        opening a new TCP+TLS connection each time.
+
+        Args:
+            max_connections (int): Maximum number of concurrent connections.
+            max_connections_per_host (int): Maximum number of concurrent connections to one host.
+            request_timeout (float): Total timeout in seconds for a single request.
+            connect_timeout (float): Timeout in seconds to establish a connection.
+            dns_cache_ttl (int): Seconds to keep resolved host names in the DNS cache.
+            keepalive_timeout (float): Seconds an idle connection is kept open for reuse.
+            rate_limit_service (str): The rate limiter bucket requests are drawn from, None disables rate limiting.
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_limit_service = rate_limit_service
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self._session = None
+
+    @property
+    def session(self):
+        # The session is created lazily so it is bound to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def throttle(self):
+        # Wait for this pool's rate limiter bucket, call before every request sent through the session
+        if self.rate_limit_service:
+            await rate_limiter.acquire_async(self.rate_limit_service)
+
+    def observe(self, response):
+        if self.rate_limit_service:
+            rate_limiter.observe(self.rate_limit_service, response.headers, response.status)
+
+    async def get_text(self, url, **kwargs):
+        await self.throttle()
+        async with self.session.get(url, **kwargs) as response:
+            self.observe(response)
+            response.raise_for_status()
+            return await response.text()
+
+    async def fetch(self, url, headers=None, **kwargs):
+        # Returns (status, headers, text) without raising on 304 Not Modified
+        await self.throttle()
+        async with self.session.get(url, headers=headers, **kwargs) as response:
+            self.observe(response)
+            if response.status == 304:
+                return response.status, response.headers, None
+            response.raise_for_status()
+            return response.status, response.headers, await response.text()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+@asynccontextmanager
+async def borrow_pool(pool=None):
+    # Use the caller's pool if one is given, otherwise open a temporary one for this call
+    if pool is not None:
+        yield pool
+        return
+    async with HttpPool() as temporary_pool:
+        yield temporary_pool
@@ -0,0 +1,60 @@
+import heapq
+import itertools
+from datetime import datetime, timezone
+
+MIN_AGE_HOURS = 1.0  # Floor for a video's age so brand new uploads do not get an infinite velocity
+
+
+def views_per_hour(views, published_at, now=None):
+    now = now or datetime.now(timezone.utc)
+    age_hours = max((now - published_at).total_seconds() / 3600, MIN_AGE_HOURS)
+    return views / age_hours
+
+
+def make_video_record(channel_id, video, views, now=None):
+    # The structured record the monitor hands around for every candidate video
+    return {
+        'id': video['id'],
+        'url': video['url'],
+        'title': video['title'],
+        'channel_id': channel_id,
+        'published_at': video['published_at'],
+        'views': views,
+        'views_per_hour': views_per_hour(views, video['published_at'], now)
+    }
+
+
+class TopK:
+    def __init__(self, k, key=lambda record: record['views_per_hour']):
+        """
+        Bounded selector that keeps the k highest scoring items seen so far.
+
+        Items are pushed one at a time into a min-heap of size k, so memory stays
+        O(k) however many candidates stream through it.
+
+        Args:
+            k (int): The number of items to keep.
+            key (callable): Returns the score of an item.
+        """
+        self.k = k
+        self.key = key
+        self._heap = []
+        # Tie-breaker so items with equal scores are never compared directly. It counts down,
+        # so among equal scores the latest item is evicted first, like a stable sort keeps the earliest
+        self._counter = itertools.count(0, -1)
+
+    def push(self, item):
+        if self.k <= 0:
+            return
+        entry = (self.key(item), next(self._counter), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def sorted(self):
+        # Highest score first
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+
+DEFAULT_REGISTRY_SNAPSHOT_PATH = "operation_data/cache/channel_registry.json"
+SNAPSHOT_TTL = 3600  # Seconds a local snapshot of the channel table is trusted
+SCAN_SEGMENTS = 4  # Number of parallel scan segments
+
+
+def scan_segment(client, table_name, segment, total_segments):
+    # Scan one segment page by page until DynamoDB stops returning a LastEvaluatedKey
+    channel_ids = []
+    scan_kwargs = {
+        'TableName': table_name,
+        'ProjectionExpression': 'channel_id',
+        'Segment': segment,
+        'TotalSegments': total_segments
+    }
+    while True:
+        response = client.scan(**scan_kwargs)
+        channel_ids.extend(item['channel_id']['S'] for item in response.get('Items', []) if 'channel_id' in item)
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return channel_ids
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def load_snapshot(snapshot_path, table_name):
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, 'r') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable channel registry snapshot {snapshot_path}: {e}")
+        return None
+    return snapshot if snapshot.get('table_name') == table_name else None
+
+
+def save_snapshot(snapshot_path, table_name, channel_ids):
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    temp_path = f"{snapshot_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'table_name': table_name, 'fetched_at': time.time(), 'channel_ids': channel_ids}, f)
+    os.replace(temp_path, snapshot_path)
+
+
+async def get_channel_ids(table_name, segments=SCAN_SEGMENTS, snapshot_path=DEFAULT_REGISTRY_SNAPSHOT_PATH,
+                          snapshot_ttl=SNAPSHOT_TTL, refresh=False):
+    """
+    Load the IDs of all monitored channels from the YouTubeChannelMonitor table.
+
+    The table is read with a paginated, parallel segment scan that only projects
+    channel_id. The result is kept as a local snapshot, and runs within snapshot_ttl
+    seconds of it skip DynamoDB entirely.
+
+    Args:
+        table_name (str): The DynamoDB table holding the monitored channels.
+        segments (int): The number of scan segments to read in parallel.
+        snapshot_path (str): The path to the local snapshot file.
+        snapshot_ttl (float): Seconds the snapshot is used before rescanning.
+        refresh (bool): Ignore the snapshot and always scan.
+
+    Returns:
+        list: The unique channel IDs.
+    """
+    snapshot = load_snapshot(snapshot_path, table_name)
+    if snapshot and not refresh and time.time() - snapshot['fetched_at'] < snapshot_ttl:
+        print(f"Using channel registry snapshot with {len(snapshot['channel_ids'])} channels")
+        return snapshot['channel_ids']
+
+    # boto3 clients are thread-safe, so one client serves every segment
+    client = boto3.client('dynamodb')
+    try:
+        segment_results = await asyncio.gather(*[
+            asyncio.to_thread(scan_segment, client, table_name, segment, segments)
+            for segment in range(segments)
+        ])
+    except ClientError as e:
+        print(f"Error fetching channel IDs from DynamoDB: {e}")
+        if snapshot:
+            print("Falling back to the stale channel registry snapshot")
+            return snapshot['channel_ids']
+        return []
+
+    # A channel can be listed under several names, keep each ID once
+    channel_ids = list(dict.fromkeys(channel_id for result in segment_results for channel_id in result))
+    save_snapshot(snapshot_path, table_name, channel_ids)
+    return channel_ids
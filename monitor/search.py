@@ -2,81 +2,169 @@ import feedparser
 from datetime import datetime, timedelta, timezone
 import aiohttp
 import asyncio
-import re
-import boto3
-from botocore.exceptions import ClientError
+from .http_pool import borrow_pool
+from .feed_cache import FeedCache
+from .feed_state import FeedStateStore
+from .views import WatchPageViewCountProvider, YouTubeApiViewCountProvider, default_view_count_provider
+from .ranking import TopK, make_video_record
+from .registry import get_channel_ids
 
-async def get_latest_videos_rss(channel_id, hours_ago=24):
-    print(f"Fetching RSS feed for channel ID: {channel_id}")
+async def fetch_feed_entries(channel_id, pool, feed_cache=None):
     rss_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(rss_url) as response:
-            feed_content = await response.text()
-
-    feed = feedparser.parse(feed_content)
+    request_headers = feed_cache.request_headers(channel_id) if feed_cache is not None else None
+    status, response_headers, feed_content = await pool.fetch(rss_url, headers=request_headers)
 
-    current_time = datetime.now(timezone.utc)
-    time_threshold = current_time - timedelta(hours=hours_ago)
+    if status == 304 and feed_cache is not None:
+        # The feed has not changed since the last run, reuse the parsed entries
+        cached_entries = feed_cache.get_entries(channel_id)
+        if cached_entries is not None:
+            return cached_entries
 
-    videos = []
+    feed = feedparser.parse(feed_content or "")
+    entries = []
     for entry in feed.entries:
-        published_time = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
-        if published_time > time_threshold:
+        try:
             video_id = entry.yt_videoid
-            videos.append({
+            entries.append({
                 'id': video_id,
-                'title': entry.title,
-                'published_at': published_time,
+                'title': entry.get('title', ''),
+                'published_at': datetime(*entry.published_parsed[:6], tzinfo=timezone.utc),
                 'url': f"https://www.youtube.com/watch?v={video_id}"
             })
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            # A malformed entry is skipped, the rest of the feed is still used
+            print(f"Skipping malformed feed entry for channel ID {channel_id}: {e!r}")
+
+    if feed_cache is not None:
+        feed_cache.store(channel_id, response_headers, entries)
+    return entries
+
+async def get_latest_videos_rss(channel_id, hours_ago=24, pool=None, feed_cache=None):
+    print(f"Fetching RSS feed for channel ID: {channel_id}")
+    try:
+        async with borrow_pool(pool) as pool:
+            entries = await fetch_feed_entries(channel_id, pool, feed_cache)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error fetching RSS feed for channel ID {channel_id}: {e!r}")
+        return []
+
+    current_time = datetime.now(timezone.utc)
+    time_threshold = current_time - timedelta(hours=hours_ago)
+
+    videos = [entry for entry in entries if entry['published_at'] > time_threshold]
 
     print(f"Found {len(videos)} videos within the last {hours_ago} hours for channel ID: {channel_id}")
     return videos
 
-async def get_video_details(video_id):
+async def get_video_details(video_id, pool=None):
     print(f"Fetching details for video ID: {video_id}")
-    url = f"https://www.youtube.com/watch?v={video_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            html_content = await response.text()
-
-    view_count_match = re.search(r'"viewCount":"(\d+)"', html_content)
-    view_count = int(view_count_match.group(1)) if view_count_match else 0
+    view_counts = await WatchPageViewCountProvider(pool).get_view_counts([video_id])
+    view_count = view_counts.get(video_id, 0)
 
     print(f"Video ID: {video_id} has {view_count} views")
     return {'views': view_count}
 
-async def find_top_video(channel_id, hours_ago=24):
+async def collect_view_counts(channel_videos, view_count_provider, feed_state=None):
+    # Without a state store every video is looked up, otherwise only new ones and ones past the TTL
+    if feed_state is None:
+        video_ids = [video['id'] for _, videos in channel_videos for video in videos]
+        return await view_count_provider.get_view_counts(video_ids)
+
+    stale_ids = {channel_id: feed_state.stale_video_ids(channel_id, videos) for channel_id, videos in channel_videos}
+    video_ids = [video_id for ids in stale_ids.values() for video_id in ids]
+    total_videos = sum(len(videos) for _, videos in channel_videos)
+    print(f"Refreshing view counts for {len(video_ids)} of {total_videos} recent videos")
+    fetched = await view_count_provider.get_view_counts(video_ids) if video_ids else {}
+    for channel_id, ids in stale_ids.items():
+        feed_state.update_views(channel_id, {video_id: fetched[video_id] for video_id in ids if video_id in fetched})
+
+    return {
+        video['id']: feed_state.last_views(channel_id, video['id']) or 0
+        for channel_id, videos in channel_videos for video in videos
+    }
+
+def observe_new_videos(channel_id, videos, feed_state):
+    new_videos = feed_state.observe(channel_id, videos)
+    if new_videos:
+        print(f"Found {len(new_videos)} new videos for channel ID: {channel_id}")
+    return new_videos
+
+async def find_top_video(channel_id, hours_ago=24, pool=None, feed_cache=None, view_count_provider=None, feed_state=None):
     print(f"Finding top video for channel ID: {channel_id}")
-    videos = await get_latest_videos_rss(channel_id, hours_ago)
+    videos = await get_latest_videos_rss(channel_id, hours_ago, pool=pool, feed_cache=feed_cache)
     if not videos:
         print(f"No videos found for channel ID: {channel_id}")
         return None
 
-    video_details = await asyncio.gather(*[get_video_details(video['id']) for video in videos])
-    for video, details in zip(videos, video_details):
-        video.update(details)
+    if feed_state is not None:
+        observe_new_videos(channel_id, videos, feed_state)
+    if view_count_provider is None:
+        view_count_provider = default_view_count_provider(pool)
+    view_counts = await collect_view_counts([(channel_id, videos)], view_count_provider, feed_state)
+    records = [make_video_record(channel_id, video, view_counts.get(video['id'], 0)) for video in videos]
+    top_video = max(records, key=lambda record: record['views_per_hour'])
+    print(f"Top video for channel ID {channel_id}: {top_video['url']} with {top_video['views']} views ({top_video['views_per_hour']:.1f} views/hour)")
+    return top_video
 
-    top_video = max(videos, key=lambda x: x['views'])
-    print(f"Top video for channel ID {channel_id}: {top_video['url']} with {top_video['views']} views")
-    return top_video['url']
+async def get_top_video_records(channel_ids, hours_ago=24, max_videos=5, pool=None, feed_cache=None, view_count_provider=None, feed_state=None, batch_size=YouTubeApiViewCountProvider.BATCH_SIZE):
+    """
+    Rank every recent video of every channel by views per hour and keep the top ones.
 
-async def get_top_videos(channel_ids, hours_ago=24, max_videos=5):
-    all_videos = await asyncio.gather(*[find_top_video(channel_id, hours_ago) for channel_id in channel_ids])
-    valid_videos = [video for video in all_videos if video]
-    sorted_videos = sorted(valid_videos, key=lambda x: x[1], reverse=True)  # Sort by view count
-    return [video[0] for video in sorted_videos[:max_videos]]  # Return only the URLs of the top videos
+    Feeds are processed as they arrive and their videos are resolved in batches of
+    batch_size view counts, each batch streaming through a bounded heap. Memory stays
+    O(max_videos + batch_size) however many channels are monitored.
 
-async def get_channel_ids(table_name):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    try:
-        response = await asyncio.to_thread(table.scan)
-        items = response['Items']
-        return [item['channel_id'] for item in items]
-    except ClientError as e:
-        print(f"Error fetching channel IDs from DynamoDB: {e}")
-        return []
+    Returns:
+        list: Video records (see monitor.ranking.make_video_record), best first.
+    """
+    # Unchanged feeds are answered with 304 and served from the on-disk feed cache
+    if feed_cache is None:
+        feed_cache = FeedCache()
+    # View counts fetched in earlier runs are reused until they pass the refresh TTL
+    if feed_state is None:
+        feed_state = FeedStateStore()
+
+    top_k = TopK(max_videos)
+    pending = []
+
+    async def flush_pending():
+        view_counts = await collect_view_counts(pending, view_count_provider, feed_state)
+        now = datetime.now(timezone.utc)
+        for channel_id, videos in pending:
+            for video in videos:
+                top_k.push(make_video_record(channel_id, video, view_counts.get(video['id'], 0), now))
+        pending.clear()
+
+    async def fetch_channel(channel_id):
+        return channel_id, await get_latest_videos_rss(channel_id, hours_ago, pool=pool, feed_cache=feed_cache)
+
+    # All channels share one connection pool; its connector bounds how many requests run at once
+    async with borrow_pool(pool) as pool:
+        if view_count_provider is None:
+            view_count_provider = default_view_count_provider(pool)
+
+        for next_channel in asyncio.as_completed([fetch_channel(channel_id) for channel_id in channel_ids]):
+            channel_id, videos = await next_channel
+            if not videos:
+                continue
+            observe_new_videos(channel_id, videos, feed_state)
+            pending.append((channel_id, videos))
+            if sum(len(videos) for _, videos in pending) >= batch_size:
+                await flush_pending()
+        if pending:
+            await flush_pending()
+
+    feed_cache.save()
+    feed_cache.report()
+    feed_state.save()
+    return top_k.sorted()
+
+async def get_top_videos(channel_ids, hours_ago=24, max_videos=5, pool=None, feed_cache=None, view_count_provider=None, feed_state=None):
+    top_videos = await get_top_video_records(channel_ids, hours_ago, max_videos, pool=pool, feed_cache=feed_cache,
+                                             view_count_provider=view_count_provider, feed_state=feed_state)
+    for rank, video in enumerate(top_videos, 1):
+        print(f"#{rank}: {video['url']} with {video['views']} views ({video['views_per_hour']:.1f} views/hour)")
+    return [video['url'] for video in top_videos]  # Return only the URLs of the top videos
 
 async def main(table_name):
     print("Starting main function in monitor/search.py")
@@ -0,0 +1,178 @@
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+DEFAULT_MEMBERSHIP_PATH = "operation_data/cache/shards.sqlite3"
+HEARTBEAT_INTERVAL = 15  # Seconds between membership heartbeats
+MEMBER_TTL = 45  # A node that has not sent a heartbeat for this long is considered gone
+CLAIM_TTL = 6 * 3600  # Seconds a video claim holds even while its node is alive, so a stuck video can be retried
+VIRTUAL_NODES = 100  # Points per node on the hash ring, evens out slice sizes
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes, virtual_nodes=VIRTUAL_NODES):
+        """
+        Consistent-hash ring mapping keys (channel IDs) to nodes.
+
+        When a node joins or leaves only the keys next to its points move, so most
+        channels stay on the node that already has their feed state warm.
+
+        Args:
+            nodes (iterable): The node IDs on the ring.
+            virtual_nodes (int): The number of points each node gets on the ring.
+        """
+        self.nodes = sorted(set(nodes))
+        self._points = sorted((ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in self._points]
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._hashes, ring_hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class MembershipStore:
+    """
+    Shared record of live monitor nodes and of claimed videos.
+
+    Implementations must be visible to every node taking part, e.g. a SQLite file
+    on shared storage, or a network store implementing the same methods.
+    """
+
+    def heartbeat(self, node_id):
+        raise NotImplementedError
+
+    def leave(self, node_id):
+        raise NotImplementedError
+
+    def live_nodes(self, member_ttl=MEMBER_TTL):
+        raise NotImplementedError
+
+    def claim_video(self, video_url, node_id, member_ttl=MEMBER_TTL, claim_ttl=CLAIM_TTL):
+        # Returns True for exactly one caller per video, until the claim is released, expires or its node is gone
+        raise NotImplementedError
+
+    def release_video(self, video_url, node_id):
+        raise NotImplementedError
+
+
+class SQLiteMembershipStore(MembershipStore):
+    def __init__(self, path=DEFAULT_MEMBERSHIP_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS members (node_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS claimed_videos (video_url TEXT PRIMARY KEY, node_id TEXT NOT NULL, claimed_at REAL NOT NULL)")
+
+    def connect(self):
+        # A short-lived connection per call keeps the store safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def heartbeat(self, node_id):
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO members (node_id, last_seen) VALUES (?, ?)", (node_id, time.time()))
+
+    def leave(self, node_id):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM members WHERE node_id = ?", (node_id,))
+
+    def live_nodes(self, member_ttl=MEMBER_TTL):
+        with self.connect() as conn:
+            rows = conn.execute("SELECT node_id FROM members WHERE last_seen > ?", (time.time() - member_ttl,)).fetchall()
+        return [node_id for node_id, in rows]
+
+    def claim_video(self, video_url, node_id, member_ttl=MEMBER_TTL, claim_ttl=CLAIM_TTL):
+        now = time.time()
+        with self.connect() as conn:
+            # A claim can be taken over once it expired or its node stopped sending heartbeats, e.g. after a crash
+            cursor = conn.execute(
+                "INSERT INTO claimed_videos (video_url, node_id, claimed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (video_url) DO UPDATE SET node_id = excluded.node_id, claimed_at = excluded.claimed_at "
+                "WHERE claimed_videos.claimed_at < ? "
+                "OR claimed_videos.node_id NOT IN (SELECT node_id FROM members WHERE last_seen > ?)",
+                (video_url, node_id, now, now - claim_ttl, now - member_ttl)
+            )
+            return cursor.rowcount == 1
+
+    def release_video(self, video_url, node_id):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM claimed_videos WHERE video_url = ? AND node_id = ?", (video_url, node_id))
+
+
+class ShardCoordinator:
+    def __init__(self, store, node_id=None, heartbeat_interval=HEARTBEAT_INTERVAL, member_ttl=MEMBER_TTL,
+                 virtual_nodes=VIRTUAL_NODES, on_rebalance=None):
+        """
+        Keeps this monitor instance's slice of the channel IDs up to date.
+
+        The node heartbeats into the membership store and rebuilds its hash ring
+        whenever the set of live nodes changes, so slices rebalance automatically as
+        instances join or leave.
+
+        Args:
+            store (MembershipStore): The shared membership store.
+            node_id (str): This node's ID. Defaults to hostname, PID and a random suffix.
+            heartbeat_interval (float): Seconds between heartbeats.
+            member_ttl (float): Seconds after which a silent node is dropped from the ring.
+            virtual_nodes (int): The number of ring points per node.
+            on_rebalance (callable): Called with no arguments after the ring changes.
+        """
+        self.store = store
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat_interval = heartbeat_interval
+        self.member_ttl = member_ttl
+        self.virtual_nodes = virtual_nodes
+        self.on_rebalance = on_rebalance
+        self.ring = HashRing([self.node_id], virtual_nodes)
+        self._task = None
+
+    async def refresh(self):
+        await asyncio.to_thread(self.store.heartbeat, self.node_id)
+        nodes = set(await asyncio.to_thread(self.store.live_nodes, self.member_ttl))
+        nodes.add(self.node_id)
+        if sorted(nodes) != self.ring.nodes:
+            self.ring = HashRing(nodes, self.virtual_nodes)
+            print(f"Shard membership changed, {len(nodes)} live nodes: {', '.join(sorted(nodes))}")
+            if self.on_rebalance:
+                self.on_rebalance()
+
+    async def join(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error sending shard heartbeat: {e}")
+
+    async def leave(self):
+        if self._task:
+            self._task.cancel()
+        await asyncio.to_thread(self.store.leave, self.node_id)
+
+    def owns(self, channel_id):
+        return self.ring.owner(channel_id) == self.node_id
+
+    def filter(self, channel_ids):
+        return [channel_id for channel_id in channel_ids if self.owns(channel_id)]
+
+    async def claim_video(self, video_url):
+        # Deduplicates videos across nodes, e.g. around a rebalance when two nodes briefly share a channel
+        return await asyncio.to_thread(self.store.claim_video, video_url, self.node_id, self.member_ttl)
+
+    async def release_video(self, video_url):
+        # Lets any node pick the video up again, e.g. after it failed here
+        await asyncio.to_thread(self.store.release_video, video_url, self.node_id)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import re
+import aiohttp
+from dotenv import load_dotenv
+from googleapiclient.errors import HttpError
+from rate_limiter import rate_limiter
+from .http_pool import borrow_pool
+from .channel_id import build_youtube_client
+
+load_dotenv()
+
+VIEW_COUNT_PATTERN = re.compile(rb'"viewCount":"(\d+)"')
+
+
+class ViewCountProvider:
+    """
+    Looks up view counts for a batch of YouTube video IDs.
+
+    Implementations return a dict mapping each video ID they could resolve to its
+    view count. IDs that could not be resolved are left out, so a fallback provider
+    can fill them in. Tests can swap in StaticViewCountProvider.
+    """
+
+    async def get_view_counts(self, video_ids):
+        raise NotImplementedError
+
+
+class YouTubeApiViewCountProvider(ViewCountProvider):
+    # videos.list accepts at most 50 IDs per call, each call costs 1 quota unit
+    BATCH_SIZE = 50
+
+    def __init__(self, api_key=None, youtube=None):
+        self.api_key = api_key or os.getenv("YOUTUBE_API_KEY")
+        self._youtube = youtube
+
+    @property
+    def youtube(self):
+        if self._youtube is None:
+            self._youtube = build_youtube_client(self.api_key)
+        return self._youtube
+
+    def _fetch_view_counts(self, video_ids):
+        # The googleapiclient client is not thread-safe, so batches run one after another in one thread
+        view_counts = {}
+        for start in range(0, len(video_ids), self.BATCH_SIZE):
+            batch = video_ids[start:start + self.BATCH_SIZE]
+            rate_limiter.acquire("youtube")
+            try:
+                response = self.youtube.videos().list(
+                    id=','.join(batch),
+                    part='statistics',
+                    maxResults=self.BATCH_SIZE
+                ).execute()
+            except HttpError as e:
+                rate_limiter.observe("youtube", e.resp, e.resp.status)
+                print(f"Error fetching view counts from the YouTube API: {e}")
+                continue
+            for item in response.get('items', []):
+                view_counts[item['id']] = int(item.get('statistics', {}).get('viewCount', 0))
+        return view_counts
+
+    async def get_view_counts(self, video_ids):
+        video_ids = list(dict.fromkeys(video_ids))
+        if not video_ids:
+            return {}
+        print(f"Fetching view counts for {len(video_ids)} videos from the YouTube API")
+        return await asyncio.to_thread(self._fetch_view_counts, video_ids)
+
+
+class WatchPageViewCountProvider(ViewCountProvider):
+    def __init__(self, pool=None, chunk_size=16384):
+        """
+        Scrapes the view count from the YouTube watch page.
+
+        The page is streamed and reading stops as soon as "viewCount" is found, so
+        usually only a fraction of the HTML is downloaded.
+
+        Args:
+            pool (HttpPool): The shared HTTP pool. A temporary one is used if not given.
+            chunk_size (int): The number of bytes to read from the response at a time.
+        """
+        self.pool = pool
+        self.chunk_size = chunk_size
+
+    async def get_view_count(self, video_id, pool):
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        buffer = b""
+        await pool.throttle()
+        async with pool.session.get(url) as response:
+            pool.observe(response)
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                buffer += chunk
+                match = VIEW_COUNT_PATTERN.search(buffer)
+                if match:
+                    return int(match.group(1))
+                # Keep a short tail in case the pattern straddles two chunks
+                buffer = buffer[-64:]
+        return None
+
+    async def get_view_counts(self, video_ids):
+        async with borrow_pool(self.pool) as pool:
+            async def lookup(video_id):
+                try:
+                    return video_id, await self.get_view_count(video_id, pool)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Error fetching view count for video ID {video_id}: {e!r}")
+                    return video_id, None
+
+            results = await asyncio.gather(*[lookup(video_id) for video_id in dict.fromkeys(video_ids)])
+        return {video_id: views for video_id, views in results if views is not None}
+
+
+class FallbackViewCountProvider(ViewCountProvider):
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    async def get_view_counts(self, video_ids):
+        view_counts = await self.primary.get_view_counts(video_ids)
+        missing = [video_id for video_id in video_ids if video_id not in view_counts]
+        if missing:
+            print(f"Falling back to the watch page for {len(missing)} videos")
+            view_counts.update(await self.fallback.get_view_counts(missing))
+        return view_counts
+
+
+class StaticViewCountProvider(ViewCountProvider):
+    # A local stub that serves fixed view counts, for tests and dry runs
+    def __init__(self, view_counts):
+        self.view_counts = dict(view_counts)
+
+    async def get_view_counts(self, video_ids):
+        return {video_id: self.view_counts[video_id] for video_id in video_ids if video_id in self.view_counts}
+
+
+def default_view_count_provider(pool=None):
+    # Prefer the batched API when a key is configured, keep the scraper as a fallback
+    scraper = WatchPageViewCountProvider(pool)
+    if os.getenv("YOUTUBE_API_KEY"):
+        return FallbackViewCountProvider(YouTubeApiViewCountProvider(), scraper)
+    return scraper
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import hmac
+import inspect
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+import aiohttp
+from aiohttp import web
+from .http_pool import HttpPool
+
+HUB_URL = "https://pubsubhubbub.appspot.com/subscribe"
+TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+LEASE_SECONDS = 5 * 24 * 3600  # Requested lease, the hub may grant a shorter one
+RENEW_MARGIN = 0.1  # Renew a lease once 90% of it has elapsed
+RENEW_CHECK_INTERVAL = 300  # Seconds between checks for leases due for renewal
+VERIFY_TIMEOUT = 3600  # Resend a subscription the hub has not verified within this many seconds
+
+ATOM_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015'
+}
+
+
+def topic_url(channel_id):
+    return TOPIC_URL.format(channel_id=channel_id)
+
+
+def parse_notification(body):
+    """
+    Parse a YouTube WebSub Atom notification into video dicts.
+
+    Deleted-entry notifications carry no <entry> and produce no videos.
+
+    Args:
+        body (bytes): The notification body posted by the hub.
+
+    Returns:
+        list: (channel ID, video dict) pairs, the video dicts shaped like the RSS entries.
+    """
+    root = ET.fromstring(body)
+    videos = []
+    for entry in root.findall('atom:entry', ATOM_NAMESPACES):
+        video_id = entry.findtext('yt:videoId', namespaces=ATOM_NAMESPACES)
+        channel_id = entry.findtext('yt:channelId', namespaces=ATOM_NAMESPACES)
+        published = entry.findtext('atom:published', namespaces=ATOM_NAMESPACES)
+        if not video_id or not channel_id or not published:
+            continue
+        published_at = datetime.fromisoformat(published)
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        videos.append((channel_id, {
+            'id': video_id,
+            'title': entry.findtext('atom:title', default='', namespaces=ATOM_NAMESPACES),
+            'published_at': published_at,
+            'url': f"https://www.youtube.com/watch?v={video_id}"
+        }))
+    return videos
+
+
+class WebSubReceiver:
+    def __init__(self, callback_url, on_videos, hub_url=HUB_URL, secret=None, lease_seconds=LEASE_SECONDS,
+                 host="0.0.0.0", port=8080, path="/websub", pool=None):
+        """
+        HTTP callback server for YouTube's PubSubHubbub (WebSub) feed notifications.
+
+        It subscribes channel topics at the hub, answers the hub's verification
+        requests, renews leases before they expire and parses Atom notifications
+        into the same video dicts the RSS monitor produces.
+
+        Args:
+            callback_url (str): The public URL the hub posts notifications to.
+            on_videos (callable): Called (or awaited) with (channel ID, list of video dicts) per notification.
+            hub_url (str): The hub's subscribe endpoint, point it at a local fake hub for testing.
+            secret (str): Shared secret used to sign notifications. Unsigned pushes are dropped when set.
+            lease_seconds (int): The lease duration to request.
+            host (str): The interface the callback server listens on.
+            port (int): The port the callback server listens on.
+            path (str): The URL path of the callback endpoint.
+            pool (HttpPool): The HTTP pool used to talk to the hub.
+        """
+        self.callback_url = callback_url
+        self.on_videos = on_videos
+        self.hub_url = hub_url
+        self.secret = secret
+        self.lease_seconds = lease_seconds
+        self.host = host
+        self.port = port
+        self.path = path
+        self.pool = pool or HttpPool()
+        # topic URL -> {'channel_id', 'mode', 'requested_at', 'lease_seconds', 'expires_at'}
+        self.subscriptions = {}
+        self._runner = None
+        self._renew_task = None
+        self._handlers = set()  # Notification handlers still running after the hub was acknowledged
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_get(self.path, self.handle_verification)
+        app.router.add_post(self.path, self.handle_notification)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._renew_task = asyncio.create_task(self.renew_leases())
+        print(f"WebSub callback listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._renew_task:
+            self._renew_task.cancel()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._runner:
+            await self._runner.cleanup()
+        await self.pool.close()
+
+    async def subscribe(self, channel_id, mode="subscribe"):
+        topic = topic_url(channel_id)
+        self.subscriptions[topic] = {
+            'channel_id': channel_id, 'mode': mode, 'requested_at': time.time(),
+            'lease_seconds': None, 'expires_at': None
+        }
+        data = {
+            'hub.callback': self.callback_url,
+            'hub.mode': mode,
+            'hub.topic': topic,
+            'hub.verify': 'async',
+            'hub.lease_seconds': str(self.lease_seconds)
+        }
+        if self.secret:
+            data['hub.secret'] = self.secret
+        try:
+            async with self.pool.session.post(self.hub_url, data=data) as response:
+                if response.status not in (202, 204):
+                    print(f"Hub rejected {mode} for channel ID {channel_id}: {response.status} {await response.text()}")
+                    return False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error sending {mode} request for channel ID {channel_id}: {e!r}")
+            return False
+        return True
+
+    async def sync_subscriptions(self, channel_ids):
+        # Subscribe channels that are not subscribed yet and unsubscribe the ones no longer monitored
+        wanted = {topic_url(channel_id): channel_id for channel_id in channel_ids}
+        requests = [self.subscribe(channel_id) for topic, channel_id in wanted.items() if topic not in self.subscriptions]
+        requests += [self.subscribe(subscription['channel_id'], mode="unsubscribe")
+                     for topic, subscription in self.subscriptions.items()
+                     if topic not in wanted and subscription['mode'] == "subscribe"]
+        if requests:
+            await asyncio.gather(*requests)
+
+    async def handle_verification(self, request):
+        # The hub confirms (un)subscription intent by asking us to echo hub.challenge
+        mode = request.query.get('hub.mode')
+        topic = request.query.get('hub.topic')
+        challenge = request.query.get('hub.challenge')
+        subscription = self.subscriptions.get(topic)
+        if not challenge or not subscription or subscription['mode'] != mode:
+            return web.Response(status=404)
+
+        if mode == "subscribe":
+            try:
+                lease_seconds = int(request.query.get('hub.lease_seconds', self.lease_seconds))
+            except ValueError:
+                lease_seconds = 0
+            if lease_seconds <= 0:
+                print(f"Rejecting WebSub verification with invalid lease {request.query.get('hub.lease_seconds')!r}")
+                return web.Response(status=400)
+            subscription['lease_seconds'] = lease_seconds
+            subscription['expires_at'] = time.time() + lease_seconds
+            print(f"WebSub subscription verified for channel ID {subscription['channel_id']} ({lease_seconds}s lease)")
+        else:
+            del self.subscriptions[topic]
+        return web.Response(text=challenge)
+
+    def signature_is_valid(self, body, signature_header):
+        if not self.secret:
+            return True
+        if not signature_header or '=' not in signature_header:
+            return False
+        algorithm, signature = signature_header.split('=', 1)
+        if algorithm not in ('sha1', 'sha256', 'sha384', 'sha512'):
+            return False
+        expected = hmac.new(self.secret.encode(), body, getattr(hashlib, algorithm)).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    async def handle_notification(self, request):
+        body = await request.read()
+        # Per the WebSub spec, a bad signature is still acknowledged with 2xx but otherwise ignored
+        if not self.signature_is_valid(body, request.headers.get('X-Hub-Signature')):
+            print("Ignoring WebSub notification with an invalid signature")
+            return web.Response(status=202)
+
+        try:
+            videos = parse_notification(body)
+        except ET.ParseError as e:
+            print(f"Ignoring malformed WebSub notification: {e}")
+            return web.Response(status=202)
+
+        by_channel = {}
+        for channel_id, video in videos:
+            by_channel.setdefault(channel_id, []).append(video)
+        # Acknowledge right away, a slow handler would make the hub time out and deliver the notification again
+        for channel_id, channel_videos in by_channel.items():
+            task = asyncio.create_task(self._handle_videos(channel_id, channel_videos))
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
+        return web.Response(status=204)
+
+    async def _handle_videos(self, channel_id, videos):
+        try:
+            result = self.on_videos(channel_id, videos)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"Error handling WebSub notification for channel ID {channel_id}: {e}")
+
+    def needs_renewal(self, subscription, now):
+        if subscription['expires_at'] is None:
+            # The hub never verified this subscription, ask again
+            return now - subscription['requested_at'] > VERIFY_TIMEOUT
+        return subscription['expires_at'] - now < subscription['lease_seconds'] * RENEW_MARGIN
+
+    async def renew_leases(self):
+        while True:
+            await asyncio.sleep(RENEW_CHECK_INTERVAL)
+            now = time.time()
+            due = [subscription['channel_id'] for subscription in self.subscriptions.values()
+                   if subscription['mode'] == "subscribe" and self.needs_renewal(subscription, now)]
+            if due:
+                print(f"Renewing WebSub leases for {len(due)} channels")
+                await asyncio.gather(*[self.subscribe(channel_id) for channel_id in due])
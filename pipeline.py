@@ -1,228 +1,471 @@
+import argparse
 import asyncio
 import json
 import os
 import boto3  # Import the boto3 library
-from botocore.exceptions import ClientError
-from datetime import datetime
-from recall_api import process_video
-from autoeditor.generator import generate_video
-from monitor import get_top_videos
-from reel_upload import upload_reel_from_s3
-import random
-import time
+from recall_api import process_video, NEAR_DUPLICATE, RecallClient, recall_cache, gpt_cache, model_router, similarity_index
+from autoeditor.generator import generate_video, render_video
+from autoeditor.tts import get_random_voice
+from autoeditor.prefetch import TTSPrefetcher
+from autoeditor.partition import partition_script, estimate_part_seconds, MAX_PART_SECONDS, PART_INTRO, CONTINUATION_LINE
+from monitor import get_top_videos, get_channel_ids, MonitorDaemon, WebSubReceiver, ShardCoordinator, SQLiteMembershipStore
+from reel_upload import build_caption, publish_reel
+from job_context import JobContext
+from pipeline_stages import Stage, StagedPipeline, REPORT_INTERVAL
+from publish_queue import PublishScheduler, PublishItem
+from job_store import JobStore, FINAL_JOB_STAGES, stage_reached
+from history import get_video_history, close_video_histories
+import itertools
 
 # Initialize the S3 client
 s3_client = boto3.client('s3')
 
+# Workers per pipeline stage: history and summary are network bound, rendering is CPU bound
+STAGE_WORKERS = {"history": 4, "summary": 3, "render": 1, "upload": 2}
+
+# Orders the publish backlog: earlier videos first, then by part number
+_video_sequence = itertools.count()
+
 # This function uploads a file to the specified S3 bucket
 async def upload_to_s3(file_path, bucket_name, s3_key):
     try:
         await asyncio.to_thread(s3_client.upload_file, file_path, bucket_name, s3_key)
         print(f"Successfully uploaded {file_path} to {bucket_name}/{s3_key}")
+        return True
     except Exception as e:
         print(f"Failed to upload {file_path} to S3: {e}")
+        return False
 
-# This function splits the script into parts based on a character limit
+# This function splits the script into parts that each fit into one Reel
 # This is because Instagram Reel has a limit of 90 seconds
-async def split_script(script, char_limit=1150, upper_limit=2100):
-    def simple_split(arr, char_limit, upper_limit):
-        parts = []
-        current_part = []
-        current_length = 0
-
-        for i, element in enumerate(arr):
-            element_length = len(element)
-
-            # Check if the remaining elements (including current) are between char_limit and upper_limit
-            remaining_length = sum(len(e) for e in arr[i:])
-            if not current_part and char_limit < remaining_length <= upper_limit:
-                middle_index = i + (len(arr[i:]) // 2)
-                parts.append(arr[i:middle_index])
-                parts.append(arr[middle_index:])
-                return parts
-
-            if current_length + element_length > char_limit and current_part:
-                parts.append(current_part)
-                current_part = []
-                current_length = 0
-
-            current_part.append(element)
-            current_length += element_length
-
-        if current_part:
-            parts.append(current_part)
-
-        return parts
-
-    optimized_parts = simple_split(script, char_limit, upper_limit)
+async def split_script(script, max_part_seconds=MAX_PART_SECONDS):
+    optimized_parts = partition_script(script, max_part_seconds)
 
     # Print the different parts of the video script
     for i, part in enumerate(optimized_parts, 1):
         print(f"\nPart {i}:")
         print("\n".join(part))
         print(f"Character count: {sum(len(s) for s in part)}")
+        print(f"Estimated duration: {estimate_part_seconds(part, i, i == len(optimized_parts)):.1f} seconds")
 
     return optimized_parts
 
-async def generate_video_part(part_content, clip_generation_mode, part_number, selected_voice, bucket_name):
-    temp_script_file = f"inputs/temp_script_part_{part_number}.json"
-    os.makedirs("inputs", exist_ok=True)  # Ensure inputs directory exists
-    os.makedirs("outputs", exist_ok=True)  # Ensure outputs directory exists
-    with open(temp_script_file, 'w') as f:
-        json.dump(part_content, f, indent=2)
-
-    try:
-        selected_voice = await asyncio.to_thread(
-            generate_video,
-            temp_script_file,
-            clip_generation_mode,
-            part_number=part_number,
-            selected_voice=selected_voice
-        )
-
-        # Get the YouTube video ID from structured_summary.json
-        with open("operation_data/structured_summary.json", "r") as f:
-            structured_summary = json.load(f)
-        video_url = structured_summary.get("video_url", "")
-        video_id = video_url.split("v=")[-1]
-
-        # Upload the generated video to S3
-        video_file = f"outputs/reel_output_p{part_number}.mp4"
-        s3_key = f"videos/{video_id}_p{part_number}.mp4"
-        await upload_to_s3(video_file, bucket_name, s3_key)
-
-        # Get the S3 URL for the uploaded video
-        s3_video_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-
-        # Upload the video to Instagram Reels
-        upload_success = await asyncio.to_thread(upload_reel_from_s3, s3_video_url, part_number)
-        if upload_success:
-            print(f"Successfully uploaded Part {part_number} to Instagram Reels")
-
-            # Add a random delay after successful upload
-            delay = random.uniform(10, 600)  # Random delay between 10s to 10 minutes
-            print(f"Waiting for {delay:.2f} seconds before processing the next video...")
-            await asyncio.sleep(delay)
-        else:
-            print(f"Failed to upload Part {part_number} to Instagram Reels")
-
-    except Exception as e:
-        print(f"Error during video generation for Part {part_number}: {e}")
-    finally:
-        # Remove the temporary script file after uploading
-        os.remove(temp_script_file)
-
-    return selected_voice
-
-# Main function to process a video URL and generate video(s)
-async def process_and_generate_video(video_url, bucket_name, dynamo_table_name, clip_generation_mode="combine", test_video_only=False, min_char_count=800):
-    # Create operation_data directory if it doesn't exist
-    os.makedirs("operation_data", exist_ok=True)
-
-    # Check if the video has already been processed
-    if await check_video_history(dynamo_table_name, video_url):
-        print(f"Video {video_url} has already been processed and uploaded. Skipping...")
-        return
-
-    # Process the video URL to generate an enhanced summary
-    print(f"Processing video: {video_url}")
-    enhanced_summary, processed_video_url = await process_video(video_url)
-
-    if not enhanced_summary:
-        print(f"Failed to process video: {video_url}")
-        return
-
-    print("Video processed successfully!")
-    print("Enhanced summary:")
-    print(json.dumps(enhanced_summary, indent=2))
+class VideoTask:
+    def __init__(self, video_url, bucket_name, dynamo_table_name, clip_generation_mode="combine", min_char_count=800):
+        """
+        A video on its way through the pipeline stages.
+
+        Args:
+            video_url (str): The YouTube video to turn into Reels.
+            bucket_name (str): The S3 bucket the rendered parts are uploaded to.
+            dynamo_table_name (str): The DynamoDB table with the video history.
+            clip_generation_mode (str): The background clip mode passed to the video editor.
+            min_char_count (int): Scripts shorter than this are not turned into videos.
+        """
+        self.video_url = video_url
+        self.bucket_name = bucket_name
+        self.dynamo_table_name = dynamo_table_name
+        self.clip_generation_mode = clip_generation_mode
+        self.min_char_count = min_char_count
+        self.job = None
+        self.prefetcher = None
+        self.selected_voice = None
+        self.parts_left = 0
+        self.sequence = next(_video_sequence)
+        # The job store record when the video is resumed after a restart
+        self.record = None
+
+    @classmethod
+    def from_record(cls, record):
+        settings = record["settings"]
+        task = cls(record["video_url"], settings["bucket_name"], settings["dynamo_table_name"],
+                   settings["clip_generation_mode"], settings["min_char_count"])
+        task.record = record
+        return task
+
+    def settings(self):
+        return {
+            "bucket_name": self.bucket_name,
+            "dynamo_table_name": self.dynamo_table_name,
+            "clip_generation_mode": self.clip_generation_mode,
+            "min_char_count": self.min_char_count
+        }
 
-    # Save the enhanced summary to the operation_data directory
-    with open("operation_data/enhanced_summary.json", "w") as f:
-        json.dump(enhanced_summary, f, indent=2)
+    def start(self, selected_voice=None):
+        # Every file this video produces lives in its own workspace, so other videos can run at the same time
+        self.job = JobContext(self.video_url)
+
+        # Pick the voice up front so script lines can be synthesized while GPT is still streaming the rest
+        self.selected_voice = selected_voice or get_random_voice()
+        self.prefetcher = TTSPrefetcher(self.selected_voice, cache_dir=self.job.path("tts_prefetch"))
+
+    async def finish(self):
+        if self.prefetcher:
+            await asyncio.to_thread(self.prefetcher.close)
+        if self.job:
+            self.job.cleanup()
+
+    async def part_finished(self):
+        # Called once per part, whether it was uploaded or failed on the way
+        self.parts_left -= 1
+        if self.parts_left == 0:
+            print(f"All video parts for {self.video_url} are done")
+            await self.finish()
+
+
+class PartTask:
+    def __init__(self, video, part_number, content, record=None):
+        self.video = video
+        self.part_number = part_number
+        self.content = content
+        # The part's row in the job store, with the outputs of the stages it already completed
+        self.record = record or {"stage": "split"}
+
+async def summarize_video(task, job_store, recall_client=None):
+    job = task.job
+    record = task.record or {}
+
+    if record.get("enhanced_summary"):
+        # Resumed after a restart: the Recall and GPT results were checkpointed
+        print(f"Resuming video {task.video_url} from its stored summaries")
+        job.set_summaries(record["structured_summary"], record["enhanced_summary"])
+        enhanced_summary = record["enhanced_summary"]
+    else:
+        # Process the video URL to generate an enhanced summary
+        print(f"Processing video: {task.video_url}")
+        enhanced_summary, result = await process_video(task.video_url, client=recall_client, on_script_line=task.prefetcher.submit, job=job, similarity_index=similarity_index,
+                                                   on_script_rejected=task.prefetcher.discard)
+
+        if result == NEAR_DUPLICATE:
+            await asyncio.to_thread(job_store.update_job, task.video_url, stage="skipped")
+            return []
+
+        if not enhanced_summary:
+            print(f"Failed to process video: {task.video_url}")
+            await asyncio.to_thread(job_store.record_job_failure, task.video_url, "summary failed")
+            return []
+
+        print("Video processed successfully!")
+        print("Enhanced summary:")
+        print(json.dumps(enhanced_summary, indent=2))
+        await asyncio.to_thread(job_store.update_job, task.video_url, stage="summarized",
+                                structured_summary=job.structured_summary, enhanced_summary=enhanced_summary)
 
     # Check if the enhanced summary is long enough
     total_chars = sum(len(s) for s in enhanced_summary['script'])
-    if total_chars < min_char_count:
-        print(f"Enhanced summary is too short ({total_chars} characters). Minimum required: {min_char_count}. Skipping video generation.")
-        return
+    if total_chars < task.min_char_count:
+        print(f"Enhanced summary is too short ({total_chars} characters). Minimum required: {task.min_char_count}. Skipping video generation.")
+        await asyncio.to_thread(job_store.update_job, task.video_url, stage="skipped")
+        return []
 
-    # Store video information in DynamoDB
-    await asyncio.to_thread(add_video_history, dynamo_table_name, processed_video_url, enhanced_summary)
+    # Store video information in the history (written to DynamoDB in batches), and its signature locally so re-uploads of it are caught early
+    await asyncio.to_thread(get_video_history(task.dynamo_table_name).add, task.video_url, enhanced_summary)
+    await asyncio.to_thread(similarity_index.add, job.structured_summary)
 
     # Split the script into parts
     script_parts = await split_script(enhanced_summary['script'])
 
-    selected_voice = None
-    # Generate video for each part of the script
+    contents = []
     for i, part_script in enumerate(script_parts, 1):
-        # Add part number and continuation text
-        part_script.insert(0, f"Part {i}.")
+        # Add part number and continuation text, split_script already counted them in each part's duration
+        part_script.insert(0, PART_INTRO.format(i))
 
         if i < len(script_parts):
-            part_script.append("To be continued in the next video")
+            part_script.append(CONTINUATION_LINE)
 
-        part_content = {
+        contents.append({
             "cover": enhanced_summary['cover'],
             "caption": enhanced_summary['caption'],
             "script": part_script
-        }
+        })
+    await asyncio.to_thread(job_store.add_parts, task.video_url, contents)
+    return [PartTask(task, i, content) for i, content in enumerate(contents, 1)]
+
+def resume_parts(task, job_store):
+    # Parts of a job that crashed after they were split, each continues from its own last stage
+    parts = []
+    for record in job_store.get_parts(task.video_url):
+        if job_store.part_is_final(record):
+            continue
+        print(f"Resuming Part {record['part_number']} of {task.video_url} after stage '{record['stage']}'")
+        parts.append(PartTask(task, record["part_number"], record["content"], record))
+    return parts
+
+def remove_partial_output(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+async def render_video_part(part, job_store):
+    job = part.video.job
+    record = part.record
+    video_url = part.video.video_url
+    part_number = part.part_number
+
+    if stage_reached(record["stage"], "uploaded"):
+        return True
+    if stage_reached(record["stage"], "rendered") and os.path.exists(record["video_path"] or ""):
+        print(f"Part {part_number} of {video_url} was already rendered")
+        return True
+
+    output_filename = job.video_path(part_number)
+    # A file left by an earlier failed render must not pass for this one
+    remove_partial_output(output_filename)
+    if stage_reached(record["stage"], "audio") and os.path.exists(record["wav_path"] or "") and os.path.exists(record["srt_path"] or ""):
+        # Only the render failed last time, the TTS audio and subtitles are reused
+        print(f"Rendering Part {part_number} of {video_url} from its stored audio")
+        rendered = await asyncio.to_thread(
+            render_video, record["audio_duration"], record["srt_path"], record["wav_path"], part.content['cover'],
+            output_filename, part.video.clip_generation_mode, part_number, job.part_dir(part_number)
+        )
+    else:
+        temp_script_file = job.script_path(part_number)
+        with open(temp_script_file, 'w') as f:
+            json.dump(part.content, f, indent=2)
+
+        def on_audio_ready(srt_path, wav_path, duration):
+            job_store.update_part(video_url, part_number, stage="audio", srt_path=srt_path, wav_path=wav_path, audio_duration=duration)
 
-        # Generate the video for this part and upload it to S3
         try:
-            selected_voice = await generate_video_part(part_content, clip_generation_mode, i, selected_voice, bucket_name)
-            print(f"Video generation for Part {i} completed successfully!")
-        except Exception as e:
-            print(f"Error during video generation for Part {i}: {e}")
+            # generate_video returns None if any step failed
+            rendered = await asyncio.to_thread(
+                generate_video,
+                temp_script_file,
+                part.video.clip_generation_mode,
+                part_number=part_number,
+                selected_voice=part.video.selected_voice,
+                prefetcher=part.video.prefetcher,
+                job=job,
+                on_audio_ready=on_audio_ready
+            ) is not None
+        finally:
+            # Remove the temporary script file after rendering
+            os.remove(temp_script_file)
+
+    if not rendered or not os.path.exists(output_filename):
+        print(f"Video generation for Part {part_number} of {video_url} failed")
+        # write_videofile can leave a truncated file behind
+        remove_partial_output(output_filename)
+        await asyncio.to_thread(job_store.record_part_failure, video_url, part_number, "render failed")
+        return False
+    await asyncio.to_thread(job_store.update_part, video_url, part_number, stage="rendered", video_path=output_filename)
+    record.update(stage="rendered", video_path=output_filename)
+    print(f"Video generation for Part {part_number} completed successfully!")
+    return True
+
+async def upload_video_part(part, publish_scheduler, job_store):
+    job = part.video.job
+    record = part.record
+    part_number = part.part_number
+
+    if stage_reached(record["stage"], "uploaded"):
+        s3_video_url = record["s3_video_url"]
+    else:
+        # Upload the generated video to S3
+        video_file = job.video_path(part_number)
+        s3_key = f"videos/{job.video_id}_p{part_number}.mp4"
+        if not await upload_to_s3(video_file, part.video.bucket_name, s3_key):
+            await asyncio.to_thread(job_store.record_part_failure, part.video.video_url, part_number, "S3 upload failed")
+            return
 
-    print("All video parts generated and uploaded to S3 successfully!")
+        # Get the S3 URL for the uploaded video
+        s3_video_url = f"https://{part.video.bucket_name}.s3.amazonaws.com/{s3_key}"
+        await asyncio.to_thread(job_store.update_part, part.video.video_url, part_number, stage="uploaded", s3_key=s3_key, s3_video_url=s3_video_url)
+        record.update(stage="uploaded", s3_key=s3_key, s3_video_url=s3_video_url)
+
+    # Hand the video to the publish scheduler, which posts it to Instagram Reels on its own schedule
+    caption = build_caption(part_number, job)
+    publish_scheduler.enqueue(PublishItem(s3_video_url, caption, (part.video.sequence, part_number),
+                                          label=f"Part {part_number} of {part.video.video_url}", context=part))
+
+def build_publish_scheduler(job_store):
+    # Posts a part to Instagram and checkpoints the container ID, so a restart polls the same container
+    def publish_part(item):
+        part = item.context
+        video_url = part.video.video_url
+
+        def on_container_created(container_id):
+            job_store.update_part(video_url, part.part_number, stage="container_created", ig_container_id=container_id)
+            part.record.update(stage="container_created", ig_container_id=container_id)
+
+        def on_container_failed(container_id):
+            # Instagram reported the container as ERROR or EXPIRED, the next attempt creates a fresh one
+            job_store.update_part(video_url, part.part_number, stage="uploaded", ig_container_id=None)
+            part.record.update(stage="uploaded", ig_container_id=None)
+
+        success = publish_reel(item.s3_video_url, item.caption, container_id=part.record.get("ig_container_id"),
+                               on_container_created=on_container_created, on_container_failed=on_container_failed)
+        if success:
+            job_store.update_part(video_url, part.part_number, stage="published")
+        else:
+            job_store.record_part_failure(video_url, part.part_number, "Instagram publish failed")
+        if job_store.complete_if_finished(video_url):
+            print(f"Every part of {video_url} has been handled")
+        return success
+
+    return PublishScheduler(publish_part)
+
+# The stages every video goes through, one video can render while the next one is being summarized
+def build_video_pipeline(publish_scheduler, job_store, recall_client=None, stage_workers=STAGE_WORKERS, report_interval=REPORT_INTERVAL):
+    async def history_stage(task):
+        record = task.record or await asyncio.to_thread(job_store.get_job, task.video_url)
+        if record and record["stage"] in FINAL_JOB_STAGES:
+            print(f"Video {task.video_url} was already handled by an earlier run ({record['stage']}). Skipping...")
+            return None
+        if record and task.record is None:
+            # A fresh task for a video whose unfinished job is resumed from the job store, one task per video
+            print(f"Video {task.video_url} already has an unfinished job ({record['stage']}). Skipping...")
+            return None
+        if record:
+            # An unfinished job of ours, it may already be in the history table
+            return task
+
+        # Check if the video has already been processed
+        if await get_video_history(task.dynamo_table_name).check(task.video_url):
+            print(f"Video {task.video_url} has already been processed and uploaded. Skipping...")
+            return None
+        await asyncio.to_thread(job_store.create_job, task.video_url, task.settings())
+        return task
+
+    async def summary_stage(task):
+        record = task.record or {}
+        task.start(record.get("selected_voice"))
+        if not record.get("selected_voice"):
+            await asyncio.to_thread(job_store.update_job, task.video_url, selected_voice=task.selected_voice)
+        try:
+            if record.get("stage") == "recorded":
+                # The captions of the resumed parts are built from the stored summaries
+                task.job.set_summaries(record["structured_summary"], record["enhanced_summary"])
+                parts = resume_parts(task, job_store)
+                if not parts:
+                    await asyncio.to_thread(job_store.complete_if_finished, task.video_url)
+            else:
+                parts = await summarize_video(task, job_store, recall_client)
+        except Exception as e:
+            await asyncio.to_thread(job_store.record_job_failure, task.video_url, e)
+            await task.finish()
+            raise
+        if not parts:
+            await task.finish()
+            return None
+        task.parts_left = len(parts)
+        return parts
 
+    async def render_stage(part):
+        try:
+            rendered = await render_video_part(part, job_store)
+        except Exception as e:
+            await asyncio.to_thread(job_store.record_part_failure, part.video.video_url, part.part_number, e)
+            await part.video.part_finished()
+            raise
+        if not rendered:
+            await part.video.part_finished()
+            return None
+        return part
+
+    async def upload_stage(part):
+        try:
+            await upload_video_part(part, publish_scheduler, job_store)
+        except Exception as e:
+            # Counted like any other failure, so a part that keeps crashing runs out of attempts
+            await asyncio.to_thread(job_store.record_part_failure, part.video.video_url, part.part_number, e)
+            raise
+        finally:
+            await part.video.part_finished()
+
+    return StagedPipeline([
+        Stage("history", history_stage, stage_workers["history"]),
+        Stage("summary", summary_stage, stage_workers["summary"]),
+        Stage("render", render_stage, stage_workers["render"]),
+        Stage("upload", upload_stage, stage_workers["upload"]),
+    ], report_interval=report_interval)
+
+async def resume_unfinished_jobs(video_pipeline, job_store):
+    # Jobs interrupted by a crash or restart continue from their last checkpoint, returns their URLs
+    resumed = set()
+    for record in await asyncio.to_thread(job_store.unfinished_jobs):
+        print(f"Resuming unfinished job for {record['video_url']} (last stage: {record['stage']})")
+        await video_pipeline.submit(VideoTask.from_record(record))
+        resumed.add(record["video_url"])
+    return resumed
 
-def add_video_history(table_name, video_url, enhanced_summary):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    try:
-        table.put_item(
-            Item={
-                'video_url': video_url,
-                'processed_at': datetime.now().isoformat(),
-                'enhanced_summary': json.dumps(enhanced_summary)
-            }
-        )
-        print(f"Added video history for: {video_url}")
-    except ClientError as e:
-        print(f"Error adding video history to DynamoDB: {e}")
+# Main function to process a video URL and generate video(s)
+async def process_and_generate_video(video_url, bucket_name, dynamo_table_name, clip_generation_mode="combine", test_video_only=False, min_char_count=800):
+    # Create operation_data directory if it doesn't exist
+    os.makedirs("operation_data", exist_ok=True)
 
-async def check_video_history(table_name, video_url):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+    job_store = JobStore()
+    publish_scheduler = build_publish_scheduler(job_store)
+    # One Recall client for every video, so its session and concurrency cap are shared
+    recall_client = RecallClient()
+    video_pipeline = build_video_pipeline(publish_scheduler, job_store, recall_client, report_interval=None)
+    publish_scheduler.start()
+    video_pipeline.start()
     try:
-        # Use a query instead of get_item
-        response = await asyncio.to_thread(
-            table.query,
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('video_url').eq(video_url)
-        )
-        if response['Items']:
-            latest_item = max(response['Items'], key=lambda x: x['processed_at'])
-            print(f"Found existing entry for video: {video_url}")
-            print(f"Processed at: {latest_item['processed_at']}")
-            return True
-        return False
-    except ClientError as e:
-        print(f"Error checking video history in DynamoDB: {e}")
+        record = await asyncio.to_thread(job_store.get_job, video_url)
+        if record and record["stage"] not in FINAL_JOB_STAGES:
+            # Continue the unfinished job instead of starting a second one for the same video
+            await video_pipeline.submit(VideoTask.from_record(record))
+        else:
+            await video_pipeline.submit(VideoTask(video_url, bucket_name, dynamo_table_name, clip_generation_mode, min_char_count))
+        await video_pipeline.join()
+        await publish_scheduler.drain()
+    finally:
+        await video_pipeline.stop()
+        await publish_scheduler.stop()
+        await asyncio.to_thread(close_video_histories)
+        await recall_client.close()
+
+
+# Join the shard group so this instance only monitors its slice of the channels
+async def join_shards(shard_store_path, on_rebalance=None):
+    coordinator = ShardCoordinator(SQLiteMembershipStore(shard_store_path), on_rebalance=on_rebalance)
+    await coordinator.join()
+    print(f"Joined shard group as {coordinator.node_id}")
+    return coordinator
+
+# Only one instance processes a video, even if two briefly monitored the same channel
+async def claim_video(coordinator, url):
+    if coordinator and not await coordinator.claim_video(url):
+        print(f"Video {url} was already picked up by another monitor instance. Skipping...")
         return False
+    return True
 
-async def get_channel_ids(table_name):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    response = await asyncio.to_thread(table.scan)
-    return [item['channel_id'] for item in response.get('Items', [])]
+# Videos this instance gave up on are released, so another instance may try them
+async def release_failed_claims(coordinator, job_store, video_urls):
+    if not coordinator:
+        return
+    for url in video_urls:
+        record = await asyncio.to_thread(job_store.get_job, url)
+        if record and record["stage"] == "failed":
+            await coordinator.release_video(url)
+            print(f"Released the claim on failed video {url}")
 
 # Main entry point of the script
-async def main():
+async def main(shard_store_path=None):
     channel_table_name = "YouTubeChannelMonitor"
-    video_history_table_name = "VideoProcessingHistory"
     channel_ids = await get_channel_ids(channel_table_name)
 
+    coordinator = None
+    if shard_store_path:
+        coordinator = await join_shards(shard_store_path)
+    try:
+        await process_top_videos(channel_ids, coordinator)
+    finally:
+        # Leave even after an error, so the other instances take over this shard right away
+        if coordinator:
+            await coordinator.leave()
+
+# One run over the monitored channels: rank their recent videos and turn the top ones into Reels
+async def process_top_videos(channel_ids, coordinator=None):
+    video_history_table_name = "VideoProcessingHistory"
+
+    if coordinator:
+        # Give instances started at the same time one heartbeat to see each other
+        await asyncio.sleep(coordinator.heartbeat_interval)
+        await coordinator.refresh()
+        channel_ids = coordinator.filter(channel_ids)
+        print(f"Monitoring {len(channel_ids)} channels in this shard")
+
     # Set the hours_ago parameter
     hours_ago = 48  # You can change this value as needed
 
@@ -235,16 +478,133 @@ async def main():
     # Get top video URLs from monitored channels
     top_video_urls = await get_top_videos(channel_ids, hours_ago, max_videos)
 
-    # Process each video URL
-    for url in top_video_urls:
-        try:
-            await process_and_generate_video(url, "recall-bot-ig-reel", video_history_table_name, test_video_only=False, min_char_count=min_char_count)
-        except Exception as e:
-            print(f"Error processing video {url}: {e}")
-            import traceback
-            traceback.print_exc()  # This will print the full stack trace
+    # Feed the video URLs through the pipeline stages, each stage works on a different video at the same time
+    os.makedirs("operation_data", exist_ok=True)
+    # Rendering runs at full speed, finished Reels wait in the publish scheduler's backlog
+    job_store = JobStore()
+    publish_scheduler = build_publish_scheduler(job_store)
+    recall_client = RecallClient()
+    video_pipeline = build_video_pipeline(publish_scheduler, job_store, recall_client)
+    publish_scheduler.start()
+    video_pipeline.start()
+    claimed_urls = []
+    try:
+        resumed_urls = await resume_unfinished_jobs(video_pipeline, job_store)
+        # Check all candidates against the history at once, the history stage then answers from the local index
+        processed_urls = await get_video_history(video_history_table_name).check_many(top_video_urls)
+        for url in top_video_urls:
+            if url in resumed_urls:
+                continue
+            if url in processed_urls:
+                print(f"Video {url} has already been processed and uploaded. Skipping...")
+                continue
+            if not await claim_video(coordinator, url):
+                continue
+            claimed_urls.append(url)
+            await video_pipeline.submit(VideoTask(url, "recall-bot-ig-reel", video_history_table_name, min_char_count=min_char_count))
+        await video_pipeline.join()
+        video_pipeline.report()
+        await publish_scheduler.drain()
+        await release_failed_claims(coordinator, job_store, claimed_urls)
+    finally:
+        await video_pipeline.stop()
+        await publish_scheduler.stop()
+        await asyncio.to_thread(close_video_histories)
+        await recall_client.close()
+    publish_scheduler.report()
+
+    recall_cache.report("Recall cache")
+    gpt_cache.report("Enhanced summary cache")
+    model_router.report()
+
+# Resident mode: keep monitoring and process each new video as soon as it is found
+async def run_daemon(websub_callback_url=None, websub_port=8080, shard_store_path=None):
+    channel_table_name = "YouTubeChannelMonitor"
+    video_history_table_name = "VideoProcessingHistory"
+    all_channel_ids = await get_channel_ids(channel_table_name)
+
+    # Only videos published within this window are sent to the pipeline
+    hours_ago = 48  # You can change this value as needed
+
+    # Set the minimum character count for video generation
+    min_char_count = 800  # You can adjust this value as needed
 
+    # New videos go straight into the pipeline, the daemon waits when its first stage is backed up
+    os.makedirs("operation_data", exist_ok=True)
+    job_store = JobStore()
+    publish_scheduler = build_publish_scheduler(job_store)
+    recall_client = RecallClient()
+    video_pipeline = build_video_pipeline(publish_scheduler, job_store, recall_client)
+
+    async def submit_new_video(video):
+        # Never waits on the pipeline, polling and WebSub acknowledgements must not stall when it is backed up
+        if await claim_video(coordinator, video['url']):
+            video_pipeline.submit_nowait(VideoTask(video['url'], "recall-bot-ig-reel", video_history_table_name, min_char_count=min_char_count))
+
+    receiver = None
+    coordinator = None
+    daemon = None
+
+    def owned_channels():
+        return coordinator.filter(all_channel_ids) if coordinator else all_channel_ids
+
+    async def load_channels():
+        nonlocal all_channel_ids
+        all_channel_ids = await get_channel_ids(channel_table_name)
+        channel_ids = owned_channels()
+        if receiver:
+            await receiver.sync_subscriptions(channel_ids)
+        return channel_ids
+
+    def rebalance():
+        # Another instance joined or left: take over or hand off channels right away
+        if daemon:
+            daemon.set_channels(owned_channels())
+        if receiver:
+            asyncio.create_task(receiver.sync_subscriptions(owned_channels()))
+
+    if shard_store_path:
+        coordinator = await join_shards(shard_store_path, on_rebalance=rebalance)
+    channel_ids = owned_channels()
+
+    daemon = MonitorDaemon(
+        channel_ids,
+        on_new_video=submit_new_video,
+        hours_ago=hours_ago,
+        channel_source=load_channels
+    )
+
+    # With a public callback URL, uploads are pushed by YouTube's WebSub hub and polling becomes the fallback
+    if websub_callback_url:
+        receiver = WebSubReceiver(websub_callback_url, daemon.handle_pushed_videos, secret=os.getenv("WEBSUB_SECRET"), port=websub_port)
+        await receiver.start()
+        await receiver.sync_subscriptions(channel_ids)
+
+    publish_scheduler.start()
+    video_pipeline.start()
+    try:
+        await resume_unfinished_jobs(video_pipeline, job_store)
+        await daemon.run()
+    finally:
+        await video_pipeline.stop()
+        await publish_scheduler.stop()
+        await asyncio.to_thread(close_video_histories)
+        await recall_client.close()
+        if receiver:
+            await receiver.stop()
+        if coordinator:
+            await coordinator.leave()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Turn new videos from monitored YouTube channels into Instagram Reels")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll channels on an adaptive schedule")
+    parser.add_argument("--websub-callback", help="Public URL of this host's WebSub callback, enables push notifications in daemon mode")
+    parser.add_argument("--websub-port", type=int, default=8080, help="Port the WebSub callback server listens on")
+    parser.add_argument("--shard-store", help="Path to a SQLite membership file shared by all instances, enables sharded monitoring")
+    args = parser.parse_args()
+
+    if args.daemon:
+        asyncio.run(run_daemon(args.websub_callback, args.websub_port, args.shard_store))
+    else:
+        asyncio.run(main(args.shard_store))
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+QUEUE_SIZE = 4  # Items waiting in front of a stage before the stage feeding it blocks
+REPORT_INTERVAL = 60  # Seconds between queue depth and utilization reports
+
+
+class Stage:
+    def __init__(self, name, handler, workers=1, queue_size=QUEUE_SIZE):
+        """
+        One step of a StagedPipeline, with its own input queue and worker pool.
+
+        The handler is awaited with one item at a time. It returns the item for the
+        next stage, a list of items to fan out, or None to drop the item. The
+        bounded queue is the backpressure: when it is full, the stage feeding it
+        waits instead of piling up work.
+
+        Args:
+            name (str): Used in the reports.
+            handler (coroutine function): Processes one item.
+            workers (int): The number of items processed at the same time.
+            queue_size (int): The maximum number of items waiting for this stage.
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    async def put(self, item):
+        await self.queue.put(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def work(self):
+        while True:
+            item = await self.queue.get()
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                result = await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                print(f"Error in pipeline stage '{self.name}': {e}")
+                import traceback
+                traceback.print_exc()  # This will print the full stack trace
+                self.failed += 1
+                result = None
+            finally:
+                self.busy -= 1
+                self.busy_seconds += time.monotonic() - started
+            try:
+                if result is not None and self.next_stage is not None:
+                    for next_item in (result if isinstance(result, list) else [result]):
+                        await self.next_stage.put(next_item)
+            finally:
+                self.queue.task_done()
+
+
+class StagedPipeline:
+    def __init__(self, stages, report_interval=REPORT_INTERVAL):
+        """
+        Stages connected by bounded asyncio queues, each with its own workers.
+
+        Different items are in different stages at the same time, e.g. one video's
+        Recall and GPT calls run while another one renders.
+
+        Args:
+            stages (list): The Stage objects in processing order.
+            report_interval (float): Seconds between progress reports while running, None disables them.
+        """
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+        self.report_interval = report_interval
+        # Unbounded hand-off for callers that must not wait, e.g. push notifications and the monitor daemon
+        self._intake = asyncio.Queue()
+        self._tasks = []
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._tasks.append(asyncio.create_task(self._feed_intake()))
+        for stage in self.stages:
+            self._tasks.extend(asyncio.create_task(stage.work()) for _ in range(stage.workers))
+        if self.report_interval:
+            self._tasks.append(asyncio.create_task(self._report_periodically()))
+
+    async def submit(self, item):
+        # Waits while the first stage's queue is full
+        await self.stages[0].put(item)
+
+    def submit_nowait(self, item):
+        # Returns right away, the item enters the first stage as soon as its queue has room
+        self._intake.put_nowait(item)
+
+    async def _feed_intake(self):
+        while True:
+            item = await self._intake.get()
+            try:
+                await self.stages[0].put(item)
+            finally:
+                self._intake.task_done()
+
+    async def join(self):
+        # Each stage hands its output on before marking its input done, so draining in order drains everything
+        await self._intake.join()
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.report()
+
+    def report(self):
+        elapsed = max(time.monotonic() - (self._started or time.monotonic()), 1e-9)
+        print(f"Pipeline stages ({self._intake.qsize()} waiting to enter):")
+        for stage in self.stages:
+            utilization = stage.busy_seconds / (elapsed * stage.workers)
+            print(f"  {stage.name}: queue {stage.queue.qsize()}/{stage.queue.maxsize} (max {stage.max_depth}), "
+                  f"{stage.busy}/{stage.workers} workers busy, {utilization:.0%} utilization, "
+                  f"{stage.processed} done, {stage.failed} failed")
@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+# Randomized spacing between two Instagram posts, so the account doesn't post in machine-like bursts
+MIN_SPACING = 10  # Seconds
+MAX_SPACING = 600  # Seconds
+
+
+class PublishItem:
+    def __init__(self, s3_video_url, caption, order_key, label="", context=None):
+        """
+        A rendered Reel in S3, ready to be posted.
+
+        Args:
+            s3_video_url (str): The public S3 URL of the video.
+            caption (str): The Instagram caption.
+            order_key (tuple): Items are posted in ascending order of this key, e.g. (video sequence, part number).
+            label (str): Describes the item in log messages.
+            context (object): Passed through untouched for the publish callable, e.g. the part being posted.
+        """
+        self.s3_video_url = s3_video_url
+        self.caption = caption
+        self.order_key = order_key
+        self.label = label or s3_video_url
+        self.context = context
+
+
+class PublishScheduler:
+    def __init__(self, publish, min_spacing=MIN_SPACING, max_spacing=MAX_SPACING):
+        """
+        Posts finished Reels to Instagram with a randomized gap between posts.
+
+        Rendering and S3 uploads hand their results to enqueue and carry on right
+        away. The scheduler keeps the ready-to-post backlog ordered by order_key, so
+        the parts of a video go out in order, and waits a random time between
+        min_spacing and max_spacing after every successful post.
+
+        Args:
+            publish (callable): Posts one PublishItem, called in a worker thread and returns True on success.
+            min_spacing (float): Minimum seconds between two posts.
+            max_spacing (float): Maximum seconds between two posts.
+        """
+        self.publish = publish
+        self.min_spacing = min_spacing
+        self.max_spacing = max_spacing
+        self.backlog = []
+        self.next_post_at = 0.0
+        self.published = 0
+        self.failed = 0
+        self._counter = itertools.count()
+        self._changed = asyncio.Event()
+        self._publishing = False
+        self._task = None
+
+    def next_spacing(self):
+        return random.uniform(self.min_spacing, self.max_spacing)
+
+    def enqueue(self, item):
+        heapq.heappush(self.backlog, (item.order_key, next(self._counter), item))
+        print(f"Queued {item.label} for publishing, {len(self.backlog)} Reels ready to post")
+        self._changed.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self):
+        while True:
+            if not self.backlog:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            wait = self.next_post_at - time.monotonic()
+            if wait > 0:
+                print(f"Next Reel will be posted in {wait:.0f} seconds, {len(self.backlog)} ready to post")
+                await asyncio.sleep(wait)
+
+            # Take the head only now, an earlier part may have been queued while waiting
+            _, _, item = heapq.heappop(self.backlog)
+            self._publishing = True
+            try:
+                success = await asyncio.to_thread(self.publish, item)
+            except Exception as e:
+                print(f"Error publishing {item.label}: {e}")
+                success = False
+            finally:
+                self._publishing = False
+
+            if success:
+                self.published += 1
+                print(f"Published {item.label}")
+                self.next_post_at = time.monotonic() + self.next_spacing()
+            else:
+                self.failed += 1
+                print(f"Failed to publish {item.label}")
+            self._changed.set()
+
+    async def drain(self):
+        # Wait until every queued Reel has been posted (or failed), spacing included
+        while self.backlog or self._publishing:
+            self._changed.clear()
+            await self._changed.wait()
+
+    def report(self):
+        print(f"Publish queue: {self.published} posted, {self.failed} failed, {len(self.backlog)} waiting")
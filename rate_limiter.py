@@ -0,0 +1,217 @@
+import asyncio
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+
+# Requests per second and burst size for every outbound service, shared by all threads and event loops in the process
+SERVICE_LIMITS = {
+    "recall": (1.0, 4),
+    "openai": (2.0, 5),
+    "tts": (2.0, 4),
+    "youtube": (5.0, 10),  # YouTube Data API
+    "youtube_web": (10.0, 20),  # RSS feeds and watch pages
+    "instagram": (200 / 3600, 10),  # Graph API allows 200 calls per hour per account
+}
+DEFAULT_LIMIT = (1.0, 1)
+MIN_RATE_FRACTION = 0.1  # A bucket is never slowed below this fraction of its configured rate
+RECOVERY_FRACTION = 0.05  # Share of the configured rate won back after every successful response
+MAX_RATE_LIMIT_RETRIES = 5  # Retries of a 429 response in rate_limited_request
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+EPOCH_THRESHOLD = 1e9  # Reset headers above this are Unix timestamps rather than seconds
+
+
+def parse_duration(value):
+    """
+    Parse a rate limit header value into seconds from now.
+
+    Accepts plain seconds ("30"), Unix timestamps, HTTP dates (Retry-After) and
+    OpenAI style durations ("1m30s", "20ms").
+
+    Returns:
+        float: Seconds to wait, or None if the value can't be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = DURATION_PATTERN.findall(value)
+        if parts and ''.join(number + unit for number, unit in parts) == value:
+            scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+            return sum(float(number) * scale[unit] for number, unit in parts)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError, IndexError):
+            return None
+    if seconds > EPOCH_THRESHOLD:
+        return max(seconds - time.time(), 0.0)
+    return max(seconds, 0.0)
+
+
+def _first_header(headers, names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class TokenBucket:
+    def __init__(self, name, rate, capacity):
+        """
+        A thread-safe token bucket that callers reserve tokens from.
+
+        A caller that finds the bucket empty still takes its token, driving the
+        balance negative, and waits until the refill covers it. Waiting callers are
+        therefore served in arrival order, and sync and async callers share the same
+        bucket.
+
+        Args:
+            name (str): The service the bucket limits, used in log messages.
+            rate (float): Tokens added per second.
+            capacity (int): The maximum burst size.
+        """
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        # When the balance was last refilled, set into the future while the service asked us to back off
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _reserve(self, tokens):
+        # Returns how long the caller has to wait before using its tokens
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            return max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+
+    def acquire(self, tokens=1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        # Hand out no tokens for the next seconds, then one, reservations already made are pushed back too
+        with self._lock:
+            now = time.monotonic()
+            until = now + seconds
+            if until > self.updated:
+                self._refill(now)
+                self.tokens = min(self.tokens, 1)
+                self.updated = until
+        print(f"Rate limit for {self.name}: pausing for {seconds:.1f} seconds")
+
+    def limit_remaining(self, remaining):
+        # Never hand out more tokens than the service says are left in its window
+        with self._lock:
+            self.tokens = min(self.tokens, remaining)
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FRACTION)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.rate + self.max_rate * RECOVERY_FRACTION, self.max_rate)
+
+
+class RateLimiter:
+    def __init__(self, limits=SERVICE_LIMITS):
+        """
+        Process-wide registry of token buckets, one per outbound service.
+
+        Call acquire (or acquire_async) before every request to a service and
+        observe with the response headers and status afterwards. Retry-After and
+        x-ratelimit-* headers pause or drain the bucket, a 429 without them halves
+        the rate and successful responses win it back gradually.
+
+        Args:
+            limits (dict): Maps service names to (requests per second, burst size).
+        """
+        self.limits = limits
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, service):
+        with self._lock:
+            if service not in self._buckets:
+                rate, capacity = self.limits.get(service, DEFAULT_LIMIT)
+                self._buckets[service] = TokenBucket(service, rate, capacity)
+            return self._buckets[service]
+
+    def acquire(self, service, tokens=1):
+        self.bucket(service).acquire(tokens)
+
+    async def acquire_async(self, service, tokens=1):
+        await self.bucket(service).acquire_async(tokens)
+
+    def observe(self, service, headers=None, status=None):
+        """
+        Adapt a service's bucket to the headers and status of one of its responses.
+
+        Args:
+            service (str): The service the response came from.
+            headers (Mapping): The response headers, looked up with lower-case names.
+            status (int): The HTTP status code.
+        """
+        bucket = self.bucket(service)
+        headers = headers or {}
+
+        retry_after = parse_duration(headers.get("retry-after"))
+        remaining = _first_header(headers, ("x-ratelimit-remaining-requests", "x-ratelimit-remaining"))
+        reset = parse_duration(_first_header(headers, ("x-ratelimit-reset-requests", "x-ratelimit-reset")))
+        try:
+            remaining = float(remaining) if remaining is not None else None
+        except ValueError:
+            remaining = None
+
+        if status == 429:
+            bucket.slow_down()
+            if retry_after is None and reset is None:
+                # No hint from the service, wait for one token at the reduced rate
+                retry_after = 1 / bucket.rate
+        elif status is not None and status < 400:
+            bucket.speed_up()
+
+        if retry_after is not None and (status == 429 or status == 503):
+            bucket.pause(retry_after)
+        elif remaining is not None and remaining < 1 and reset is not None:
+            bucket.pause(reset)
+        elif remaining is not None:
+            bucket.limit_remaining(remaining)
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited_request(service, method, url, max_retries=MAX_RATE_LIMIT_RETRIES, **kwargs):
+    """
+    Send a requests call through the service's bucket, retrying 429 responses.
+
+    Returns:
+        requests.Response: The last response, which may still be a 429 if every retry was limited.
+    """
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire(service)
+        response = requests.request(method, url, **kwargs)
+        rate_limiter.observe(service, response.headers, response.status_code)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+        print(f"{service} rate limited the request, retrying ({attempt + 1}/{max_retries})...")
+    return response
@@ -1,3 +1,8 @@
-from .workflow import process_video
+from .workflow import process_video, process_videos, NEAR_DUPLICATE
+from .client import RecallClient
+from .cache import DiskCache, recall_cache, normalize_video_id
+from .gpt_summary import gpt_cache
+from .router import ModelRouter, model_router
+from .similarity import SimilarityIndex, similarity_index
 
-__all__ = ['process_video']
+__all__ = ['process_video', 'process_videos', 'NEAR_DUPLICATE', 'RecallClient', 'DiskCache', 'recall_cache', 'normalize_video_id', 'gpt_cache', 'ModelRouter', 'model_router', 'SimilarityIndex', 'similarity_index']
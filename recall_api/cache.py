@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+DEFAULT_CACHE_ROOT = "operation_data/cache"
+DEFAULT_TTL = 7 * 24 * 3600  # Seconds an entry stays valid
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # Total compressed size before the least recently used entries are evicted
+
+YOUTUBE_ID_PATTERN = re.compile(r'(?:v=|/shorts/|youtu\.be/|/embed/|/live/)([\w-]{11})')
+
+
+def normalize_video_id(video_url):
+    # Different URL forms of the same video (watch, youtu.be, shorts, extra params) share one key
+    match = YOUTUBE_ID_PATTERN.search(video_url)
+    return match.group(1) if match else video_url.strip()
+
+
+class DiskCache:
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, bypass=False):
+        """
+        Gzip-compressed JSON cache on disk with a TTL and size-capped LRU eviction.
+
+        Each entry is one file named after the hash of its key. A read updates the
+        file's access time, and when the directory grows past max_bytes the least
+        recently used entries are deleted.
+
+        Args:
+            directory (str): The directory holding the cache entries.
+            ttl (float): Seconds an entry stays valid. None keeps entries until evicted.
+            max_bytes (int): The maximum total size of the entries on disk.
+            bypass (bool): Skip reads (always miss) while still writing fresh results.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json.gz")
+
+    @staticmethod
+    def _remove(path):
+        # Another worker may have evicted or expired the entry first
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, key, bypass=False):
+        path = self._path(key)
+        if self.bypass or bypass or not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                self._remove(path)
+                self.misses += 1
+                return None
+
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+
+            # Track recency through the access time, the modification time keeps the TTL
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except FileNotFoundError:
+            # Evicted by another worker in the meantime
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # A temp file per writer, two workers may store the same key at once
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json.gz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, name))
+            total_bytes += stat.st_size
+
+        # Oldest access first
+        for _, size, name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.directory, name))
+            total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def report(self, name="Cache"):
+        stats = self.stats()
+        print(f"{name}: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions "
+              f"({stats['hit_rate'] * 100:.1f}% hit rate)")
+
+
+recall_cache = DiskCache(os.path.join(DEFAULT_CACHE_ROOT, "recall"))
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import aiohttp
+from dotenv import load_dotenv
+from rate_limiter import rate_limiter
+from .cache import recall_cache, normalize_video_id
+
+load_dotenv()
+
+RECALL_SCRAPER_URL = "https://apollo.getrecall.ai/scraper/"
+MAX_CONCURRENT_REQUESTS = 4  # Recall requests in flight at once
+MAX_RETRIES = 4  # Retries after the first attempt on 429/5xx and network errors
+BACKOFF_BASE = 1.0  # Seconds, doubled on every retry
+BACKOFF_MAX = 30.0  # Upper bound for a single backoff
+REQUEST_TIMEOUT = 180  # Seconds, Recall scrapes the video on the first request for it
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, retry_after=None):
+    # Honour the server's Retry-After, otherwise use exponential backoff with full jitter
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RecallClient:
+    def __init__(self, api_key=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, max_retries=MAX_RETRIES,
+                 timeout=REQUEST_TIMEOUT, cache=recall_cache):
+        """
+        Async client for the Recall scraper API.
+
+        Requests share one aiohttp session with keep-alive, at most
+        max_concurrent_requests run at a time, and 429/5xx responses and network
+        errors are retried with jittered exponential backoff.
+
+        Args:
+            api_key (str): The Recall API key. Defaults to RECALL_API_SECRET.
+            max_concurrent_requests (int): The maximum number of requests in flight.
+            max_retries (int): The number of retries after the first attempt.
+            timeout (float): Total timeout in seconds for one request.
+            cache (DiskCache): The response cache, None disables caching.
+        """
+        self.api_key = api_key or os.getenv('RECALL_API_SECRET')
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def fetch(self, video_url, bypass_cache=False):
+        """
+        Fetch the raw Recall summary for a video.
+
+        Returns:
+            dict: The Recall response, or None if every attempt failed.
+        """
+        cache_key = normalize_video_id(video_url)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key, bypass=bypass_cache)
+            if cached is not None:
+                print(f"Using cached Recall data for video: {video_url}")
+                return cached
+
+        async with self.semaphore:
+            raw_data = await self._fetch_with_retries(video_url)
+
+        if raw_data is not None and self.cache is not None:
+            self.cache.set(cache_key, raw_data)
+        return raw_data
+
+    async def _fetch_with_retries(self, video_url):
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            await rate_limiter.acquire_async("recall")
+            try:
+                async with self.session.get(RECALL_SCRAPER_URL, params={"url": video_url}) as response:
+                    rate_limiter.observe("recall", response.headers, response.status)
+                    if response.status in RETRY_STATUSES:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        error = f"HTTP {response.status}"
+                    else:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except aiohttp.ClientResponseError as e:
+                # Other 4xx errors will not go away by retrying
+                print(f"Error fetching data from Recall API for {video_url}: {e}")
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            except ValueError as e:
+                # A truncated or non-JSON body, e.g. an HTML error page from a proxy
+                error = f"invalid JSON response ({e})"
+
+            if attempt == self.max_retries:
+                print(f"Error fetching data from Recall API for {video_url}: {error}")
+                return None
+            delay = backoff_delay(attempt, retry_after)
+            print(f"Recall API request for {video_url} failed ({error}), retrying in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
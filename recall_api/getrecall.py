@@ -1,10 +1,19 @@
 import requests
 import os
 from dotenv import load_dotenv
+from rate_limiter import rate_limited_request
+from .cache import recall_cache, normalize_video_id
 
 load_dotenv()
 
-def fetch_recall_data(video_url):
+def fetch_recall_data(video_url, bypass_cache=False):
+    # Reruns for the same video (e.g. after a failed render or upload) reuse the stored response
+    cache_key = normalize_video_id(video_url)
+    cached = recall_cache.get(cache_key, bypass=bypass_cache)
+    if cached is not None:
+        print(f"Using cached Recall data for video: {video_url}")
+        return cached
+
     url = "https://apollo.getrecall.ai/scraper/"
     api_key = os.getenv('RECALL_API_SECRET')
 
@@ -17,9 +26,11 @@ def fetch_recall_data(video_url):
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = rate_limited_request("recall", "GET", url, headers=headers, params=params)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        raw_data = response.json()
+        recall_cache.set(cache_key, raw_data)
+        return raw_data
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error fetching data from Recall API: {e}")
         return None
@@ -1,7 +1,12 @@
+import hashlib
 import json
 import os
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from dotenv import load_dotenv
+from rate_limiter import rate_limiter, MAX_RATE_LIMIT_RETRIES
+from .cache import DiskCache, DEFAULT_CACHE_ROOT
+from .stream_parser import ScriptLineParser
+from .token_budget import fit_summary_to_budget, print_budget_report, MAX_PROMPT_TOKENS
 
 
 # Because pytube package is not working, we will not use this prompt. But I kept it here for future reference and improvement
@@ -14,27 +19,44 @@ load_dotenv()
 # Set up OpenAI API key
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+MODEL = "gpt-4"
+TEMPERATURE = 0.7
+MAX_COMPLETION_TOKENS = 4000
+# Bump whenever the prompt, system message or function schema below changes, so cached results are not reused
+PROMPT_VERSION = 2
+
+# Enhanced summaries are keyed by content, so they never go stale and are only evicted for space
+gpt_cache = DiskCache(os.path.join(DEFAULT_CACHE_ROOT, "gpt"), ttl=None, max_bytes=50 * 1024 * 1024)
+
+def enhanced_summary_cache_key(structured_summary, model=MODEL, temperature=TEMPERATURE):
+    # Canonical JSON so key order and whitespace do not change the hash
+    canonical = json.dumps(structured_summary, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"v{PROMPT_VERSION}|{model}|{temperature}|{canonical}".encode("utf-8")).hexdigest()
+
 def load_structured_summary(file_path):
     with open(file_path, 'r') as file:
         return json.load(file)
 
-def generate_enhanced_summary(structured_summary):
-    functions = [
-        {
-            "name": "create_enhanced_summary",
-            "description": "Create an enhanced summary of a video for an Instagram Reel in a specific JSON format",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "cover": {"type": "string", "description": "The cover image URL"},
-                    "caption": {"type": "string", "description": "An engaging caption for Instagram Reel, including key points and hashtags"},
-                    "script": {"type": "array", "items": {"type": "string"}, "description": "An array of strings, each containing a sentence or short paragraph for the Reel script"}
-                },
-                "required": ["cover", "caption", "script"]
-            }
+FUNCTIONS = [
+    {
+        "name": "create_enhanced_summary",
+        "description": "Create an enhanced summary of a video for an Instagram Reel in a specific JSON format",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "cover": {"type": "string", "description": "The cover image URL"},
+                "caption": {"type": "string", "description": "An engaging caption for Instagram Reel, including key points and hashtags"},
+                "script": {"type": "array", "items": {"type": "string"}, "description": "An array of strings, each containing a sentence or short paragraph for the Reel script"}
+            },
+            "required": ["cover", "caption", "script"]
         }
-    ]
+    }
+]
 
+SYSTEM_MESSAGE = "You are an expert storyteller and Instagram Reels content creator for promoting a company called Recall. Recall's product is for quickly summarizing Youtube videos and podcasts."
+
+def build_prompt(structured_summary):
+    # The summary is embedded as compact JSON, indentation only costs tokens
     prompt = f"""
     Enhance the following structured summary of a video into an engaging Instagram Reel script and caption.
     For the script:
@@ -53,28 +75,123 @@ def generate_enhanced_summary(structured_summary):
 
     Here's the structured summary to enhance:
 
-    {json.dumps(structured_summary, indent=2)}
+    {json.dumps(structured_summary, separators=(",", ":"), ensure_ascii=False)}
+    """
+    return prompt
+
+def build_messages(structured_summary):
+    # Everything that counts against the prompt token budget
+    return [SYSTEM_MESSAGE, build_prompt(structured_summary), json.dumps(FUNCTIONS)]
+
+def create_chat_completion(**kwargs):
+    # Every call goes through the shared OpenAI bucket, which follows the x-ratelimit-* headers of each response
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire("openai")
+        try:
+            raw_response = client.chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            rate_limiter.observe("openai", e.response.headers, 429)
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                raise
+            print(f"OpenAI rate limited the request, retrying ({attempt + 1}/{MAX_RATE_LIMIT_RETRIES})...")
+            continue
+        rate_limiter.observe("openai", raw_response.headers, raw_response.status_code)
+        return raw_response.parse()
+
+def request_enhanced_summary(prompt, model, temperature):
+    response = create_chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ],
+        functions=FUNCTIONS,
+        function_call={"name": "create_enhanced_summary"},
+        temperature=temperature,
+        max_tokens=MAX_COMPLETION_TOKENS
+    )
+
+    function_call = response.choices[0].message.function_call
+    if function_call and function_call.name == "create_enhanced_summary":
+        return function_call.arguments
+    print("Unexpected response format from OpenAI API")
+    return None
+
+def stream_enhanced_summary(prompt, model, temperature, on_script_line):
+    # Script lines are handed to on_script_line as soon as each one is complete in the stream
+    stream = create_chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ],
+        functions=FUNCTIONS,
+        function_call={"name": "create_enhanced_summary"},
+        temperature=temperature,
+        max_tokens=MAX_COMPLETION_TOKENS,
+        stream=True
+    )
+
+    parser = ScriptLineParser(on_script_line)
+    arguments = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        function_call = chunk.choices[0].delta.function_call
+        if function_call and function_call.arguments:
+            arguments.append(function_call.arguments)
+            parser.feed(function_call.arguments)
+
+    if not arguments:
+        print("Unexpected response format from OpenAI API")
+        return None
+    return "".join(arguments)
+
+def generate_enhanced_summary(structured_summary, model=MODEL, temperature=TEMPERATURE, bypass_cache=False,
+                              max_prompt_tokens=MAX_PROMPT_TOKENS, on_script_line=None, validate=None, details=None):
     """
+    Generate the enhanced summary of a structured summary with one model.
+
+    Args:
+        validate (callable): Returns the problems of an output, outputs with problems are not cached or served from the cache.
+        details (dict): Filled with 'cached', whether the result came from the cache instead of the API.
+    """
+    if details is not None:
+        details["cached"] = False
+
+    # Oversized summaries are trimmed locally instead of failing after a full API round trip
+    structured_summary, budget_report = fit_summary_to_budget(structured_summary, build_messages, model, MAX_COMPLETION_TOKENS, max_prompt_tokens)
+    print_budget_report(budget_report)
+
+    # Reruns and retries for an identical structured summary skip the GPT call
+    cache_key = enhanced_summary_cache_key(structured_summary, model, temperature)
+    cached = gpt_cache.get(cache_key, bypass=bypass_cache)
+    if cached is not None and validate is not None and validate(cached):
+        # Cached before outputs were validated, ask the model again
+        cached = None
+    if cached is not None:
+        print("Using cached enhanced summary")
+        if details is not None:
+            details["cached"] = True
+        if on_script_line:
+            for line in cached.get("script", []):
+                on_script_line(line)
+        return cached
+
+    prompt = build_prompt(structured_summary)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert storyteller and Instagram Reels content creator for promoting a company called Recall. Recall's product is for quickly summarizing Youtube videos and podcasts."},
-                {"role": "user", "content": prompt}
-            ],
-            functions=functions,
-            function_call={"name": "create_enhanced_summary"},
-            temperature=0.7,
-            max_tokens=4000
-        )
-
-        function_call = response.choices[0].message.function_call
-        if function_call and function_call.name == "create_enhanced_summary":
-            return json.loads(function_call.arguments)
+        if on_script_line:
+            arguments = stream_enhanced_summary(prompt, model, temperature, on_script_line)
         else:
-            print("Unexpected response format from OpenAI API")
+            arguments = request_enhanced_summary(prompt, model, temperature)
+        if arguments is None:
             return None
+
+        enhanced_summary = json.loads(arguments)
+        if validate is None or not validate(enhanced_summary):
+            gpt_cache.set(cache_key, enhanced_summary)
+        return enhanced_summary
     except Exception as e:
         print(f"An error occurred while calling the OpenAI API: {e}")
         return None
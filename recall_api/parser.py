@@ -1,6 +1,31 @@
 import json
 import re
 
+# One pass over the markdown: each match is a section heading or a bullet line
+LINE_PATTERN = re.compile(r'^(## |- )(.*)$', re.M)
+
+def bullet_text(bullet):
+    """
+    The text of a bullet in front of its timestamp link, e.g. "Point [(01:23)](https://...)".
+
+    Gives the same result as re.search(r'(.*) \[(.*?)\]\((.*?)\)', bullet).group(1)
+    without the regex backtracking: the greedy text ends at the last " [" that is
+    followed by a "](" and then a ")".
+
+    Returns:
+        str: The text before the link, or None if the bullet has no link.
+    """
+    close = bullet.rfind(")")
+    if close < 0:
+        return None
+    middle = bullet.rfind("](", 0, close)
+    if middle < 0:
+        return None
+    start = bullet.rfind(" [", 0, middle)
+    if start < 0:
+        return None
+    return bullet[:start]
+
 def parse_recall_summary(summary, video_url):
     structured_summary = {
         "title": summary.get("name", ""),
@@ -19,24 +44,22 @@ def parse_recall_summary(summary, video_url):
     links = summary.get("links", [])
     structured_summary["tags"] = [link.get("item", {}).get("name", "") for link in links if link.get("item", {}).get("name")]
 
-    # Parse markdown content
+    # Parse markdown content, only heading and bullet lines are visited
     markdown_content = summary.get("markdown", "")
-    lines = markdown_content.split("\n")
-    current_section = None
+    sections = structured_summary["summary"]
+    current_bullets = None
 
-    for line in lines:
-        if line.startswith("## "):
+    for line in LINE_PATTERN.finditer(markdown_content):
+        marker, content = line.groups()
+        if marker == "## ":
             # New section
-            section_title = line[3:].split(" [(")[0].strip()
-            current_section = section_title
-            structured_summary["summary"][current_section] = []
-        elif line.startswith("- "):
+            section_title = content.split(" [(")[0].strip()
+            current_bullets = sections[section_title] = []
+        elif current_bullets is not None:
             # Bullet point
-            bullet_point = line[2:]
-            match = re.search(r'(.*) \[(.*?)\]\((.*?)\)', bullet_point)
-            if match and current_section is not None:
-                text = match.group(1).strip()
-                structured_summary["summary"][current_section].append(text)
+            text = bullet_text(content)
+            if text is not None:
+                current_bullets.append(text.strip())
 
     return structured_summary
 
@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from .cache import DEFAULT_CACHE_ROOT
+from .gpt_summary import generate_enhanced_summary
+
+# Cheapest and fastest first, each later model is only tried when the earlier output fails validation
+MODEL_CASCADE = ["gpt-4o-mini", "gpt-4"]
+LATENCY_BUDGET = 120  # Seconds allowed for the whole cascade on one summary
+DEFAULT_EXPECTED_LATENCY = 60  # Seconds assumed for a model with no recorded calls yet
+MAX_SCRIPT_LINE_CHARS = 280  # Longer lines read badly on a Reel and exceed one TTS request
+REQUIRED_KEYS = ("cover", "caption", "script")
+REQUIRED_HASHTAG = "#RecallAI"
+DEFAULT_STATS_PATH = os.path.join(DEFAULT_CACHE_ROOT, "model_stats.json")
+
+
+def validate_enhanced_summary(enhanced_summary):
+    # Returns a list of problems, empty when the summary is usable as is
+    if not isinstance(enhanced_summary, dict):
+        return ["no function call output"]
+
+    problems = [f"missing '{key}'" for key in REQUIRED_KEYS if not enhanced_summary.get(key)]
+    script = enhanced_summary.get("script")
+    if script is not None:
+        if not isinstance(script, list) or not all(isinstance(line, str) for line in script):
+            problems.append("script is not a list of strings")
+        else:
+            long_lines = [line for line in script if len(line) > MAX_SCRIPT_LINE_CHARS]
+            if long_lines:
+                problems.append(f"{len(long_lines)} script lines longer than {MAX_SCRIPT_LINE_CHARS} characters")
+    caption = enhanced_summary.get("caption")
+    if isinstance(caption, str) and REQUIRED_HASHTAG.lower() not in caption.lower():
+        problems.append(f"caption is missing {REQUIRED_HASHTAG}")
+    return problems
+
+
+class ModelRouter:
+    def __init__(self, models=MODEL_CASCADE, latency_budget=LATENCY_BUDGET, stats_path=DEFAULT_STATS_PATH):
+        """
+        Routes summary enhancement through a cascade of models, cheapest first.
+
+        Each model's function-call output is validated. The router only escalates to
+        the next, larger model when validation fails and the remaining latency budget
+        covers that model's average recorded latency. Per-model latency, validation
+        failures and escalations are persisted to stats_path. Answers served from
+        the GPT cache are not counted, and rejected answers are not cached.
+
+        Script lines are streamed to on_script_line live from every model, so TTS
+        prefetching overlaps the generation. When an answer is rejected, the lines
+        it streamed are passed to on_script_rejected, e.g. to cancel their
+        prefetching.
+
+        Args:
+            models (list): Model names in the order they are tried.
+            latency_budget (float): Seconds allowed for the whole cascade.
+            stats_path (str): The JSON file the per-model statistics are kept in.
+        """
+        self.models = models
+        self.latency_budget = latency_budget
+        self.stats_path = stats_path
+        self.stats = {}
+        self._lock = threading.Lock()
+        if os.path.exists(stats_path):
+            try:
+                with open(stats_path, "r") as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable model stats {stats_path}: {e}")
+
+    def _model_stats(self, model):
+        return self.stats.setdefault(model, {"calls": 0, "total_latency": 0.0, "invalid": 0, "escalations": 0})
+
+    def expected_latency(self, model):
+        stats = self.stats.get(model)
+        if not stats or not stats["calls"]:
+            return DEFAULT_EXPECTED_LATENCY
+        return stats["total_latency"] / stats["calls"]
+
+    def generate(self, structured_summary, on_script_line=None, bypass_cache=False, on_script_rejected=None):
+        """
+        Generate an enhanced summary with the cheapest model whose output validates.
+
+        Returns:
+            dict: The enhanced summary, or None if no model produced one with the required keys.
+        """
+        started = time.monotonic()
+        best_effort = None
+        best_effort_live = False
+        for index, model in enumerate(self.models):
+            is_last = index + 1 == len(self.models)
+            details = {}
+            streamed = []
+
+            def stream_line(line):
+                streamed.append(line)
+                on_script_line(line)
+
+            call_started = time.monotonic()
+            enhanced_summary = generate_enhanced_summary(structured_summary, model=model, bypass_cache=bypass_cache,
+                                                         on_script_line=stream_line if on_script_line else None,
+                                                         validate=validate_enhanced_summary, details=details)
+            latency = time.monotonic() - call_started
+
+            problems = validate_enhanced_summary(enhanced_summary)
+            print(f"{model} answered in {latency:.1f} seconds" + (f", rejected: {'; '.join(problems)}" if problems else ""))
+            if not details.get("cached"):
+                # Cache hits say nothing about the model's latency or reliability
+                self._record(model, latency=latency, invalid=bool(problems))
+            if not problems:
+                self.save()
+                return enhanced_summary
+
+            if isinstance(enhanced_summary, dict) and all(enhanced_summary.get(key) for key in REQUIRED_KEYS):
+                best_effort = enhanced_summary
+                best_effort_live = True
+
+            escalate = not is_last
+            if escalate:
+                next_model = self.models[index + 1]
+                remaining = self.latency_budget - (time.monotonic() - started)
+                if remaining < self.expected_latency(next_model):
+                    print(f"Not escalating to {next_model}: {remaining:.0f}s left of the latency budget")
+                    escalate = False
+            if not escalate and best_effort is enhanced_summary:
+                # This answer is returned as the best effort, its prefetched lines are still needed
+                break
+
+            if on_script_rejected and streamed:
+                on_script_rejected(streamed)
+                if best_effort is enhanced_summary:
+                    best_effort_live = False
+            if not escalate:
+                break
+            self._record(model, escalated=True)
+            print(f"Escalating from {model} to {next_model}")
+
+        self.save()
+        if best_effort is not None and on_script_line and not best_effort_live:
+            # The best effort answer's lines were discarded when it was rejected, hand them over again
+            for line in best_effort.get("script", []):
+                on_script_line(line)
+        return best_effort
+
+    def _record(self, model, latency=None, invalid=False, escalated=False):
+        with self._lock:
+            stats = self._model_stats(model)
+            if latency is not None:
+                stats["calls"] += 1
+                stats["total_latency"] += latency
+            stats["invalid"] += int(invalid)
+            stats["escalations"] += int(escalated)
+
+    def save(self):
+        # Summary workers save from several threads, write a temp file and swap it in
+        with self._lock:
+            os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+            tmp_path = f"{self.stats_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.stats, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+
+    def report(self):
+        for model, stats in self.stats.items():
+            if not stats["calls"]:
+                continue
+            print(f"{model}: {stats['calls']} calls, {stats['total_latency'] / stats['calls']:.1f}s average latency, "
+                  f"{stats['invalid'] / stats['calls'] * 100:.0f}% invalid, "
+                  f"{stats['escalations'] / stats['calls'] * 100:.0f}% escalated")
+
+
+model_router = ModelRouter()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from .cache import DEFAULT_CACHE_ROOT, normalize_video_id
+
+DEFAULT_INDEX_PATH = os.path.join(DEFAULT_CACHE_ROOT, "similarity_index.json")
+NUM_PERMUTATIONS = 128
+BANDS = 32  # LSH bands of NUM_PERMUTATIONS // BANDS rows, candidates from about 0.4 Jaccard similarity up
+SIMILARITY_THRESHOLD = 0.6  # Estimated Jaccard similarity above which two videos count as the same material
+SHINGLE_SIZE = 3  # Words per shingle
+HASH_SEED = 20240601  # Changing it invalidates every stored signature
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def summary_shingles(structured_summary):
+    # Word n-grams of the title and every bullet, so reordered sections still match
+    texts = [structured_summary.get("title", "")]
+    for bullets in structured_summary.get("summary", {}).values():
+        texts.extend(bullets)
+
+    shingles = set()
+    for text in texts:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < SHINGLE_SIZE:
+            if words:
+                shingles.add(" ".join(words))
+            continue
+        for start in range(len(words) - SHINGLE_SIZE + 1):
+            shingles.add(" ".join(words[start:start + SHINGLE_SIZE]))
+    return shingles
+
+
+class MinHasher:
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=HASH_SEED):
+        # Universal hash functions (a * x + b) mod p stand in for random permutations
+        generator = random.Random(seed)
+        self.permutations = [
+            (generator.randrange(1, MERSENNE_PRIME), generator.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_permutations)
+        ]
+
+    def signature(self, shingles):
+        # An empty text has no signature, a constant one would match every other empty text
+        if not shingles:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+                  for shingle in shingles]
+        return [min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in hashes)
+                for a, b in self.permutations]
+
+
+def estimate_similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+class SimilarityIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=SIMILARITY_THRESHOLD, num_permutations=NUM_PERMUTATIONS, bands=BANDS):
+        """
+        MinHash/LSH index of processed videos for catching re-uploads and clips.
+
+        Each video is reduced to a MinHash signature of the word shingles in its
+        title and summary bullets. Signatures are split into bands, and videos
+        sharing any band bucket are compared by estimated Jaccard similarity. The
+        signatures are persisted to path, the buckets are rebuilt on load.
+
+        Args:
+            path (str): The JSON file the signatures are kept in.
+            threshold (float): Minimum estimated similarity to report a duplicate.
+            num_permutations (int): The signature length.
+            bands (int): The number of LSH bands, must divide num_permutations.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.hasher = MinHasher(num_permutations)
+        self.entries = None
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                if data.get("num_permutations") == self.num_permutations and data.get("seed") == HASH_SEED:
+                    self.entries = data.get("entries", {})
+                else:
+                    print(f"Similarity index {self.path} was built with other parameters, starting a new one")
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable similarity index {self.path}: {e}")
+        for video_id, entry in self.entries.items():
+            self._index(video_id, entry["signature"])
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, tuple(rows)
+
+    def _index(self, video_id, signature):
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(video_id)
+
+    def signature(self, structured_summary):
+        return self.hasher.signature(summary_shingles(structured_summary))
+
+    def find_duplicate(self, structured_summary, signature=None):
+        """
+        Look for an indexed video with nearly the same title and summary.
+
+        The video itself (same video ID) never counts as its own duplicate.
+
+        Returns:
+            tuple: (video URL, estimated similarity) of the closest match, or None.
+                Summaries without any words are never matched.
+        """
+        video_id = normalize_video_id(structured_summary.get("video_url", ""))
+        signature = signature or self.signature(structured_summary)
+        if signature is None:
+            return None
+        with self._lock:
+            self._load()
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self.buckets.get(key, ()))
+            candidates.discard(video_id)
+
+            best = None
+            for candidate in candidates:
+                similarity = estimate_similarity(signature, self.entries[candidate]["signature"])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (self.entries[candidate]["video_url"], similarity)
+        return best
+
+    def add(self, structured_summary, signature=None):
+        video_url = structured_summary.get("video_url", "")
+        video_id = normalize_video_id(video_url)
+        signature = signature or self.signature(structured_summary)
+        if signature is None:
+            print(f"Not indexing {video_url} for similarity, its summary has no words")
+            return
+        with self._lock:
+            self._load()
+            self.entries[video_id] = {
+                "video_url": video_url,
+                "title": structured_summary.get("title", ""),
+                "signature": signature
+            }
+            self._index(video_id, signature)
+            self.save()
+
+    def save(self):
+        # Callers hold the lock
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"num_permutations": self.num_permutations, "seed": HASH_SEED, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+
+similarity_index = SimilarityIndex()
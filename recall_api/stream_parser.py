@@ -0,0 +1,65 @@
+import json
+
+
+class ScriptLineParser:
+    def __init__(self, on_line, array_key="script"):
+        """
+        Incremental parser for streamed function-call arguments.
+
+        Feed it the argument deltas as they arrive. Every time a string element of
+        the top-level array named array_key is complete, on_line is called with it,
+        long before the whole JSON document has arrived.
+
+        Args:
+            on_line (callable): Called with each completed line of the array.
+            array_key (str): The key of the top-level array to emit.
+        """
+        self.on_line = on_line
+        self.array_key = array_key
+        self.lines = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer = []
+        self._last_string = None
+        self._pending_key = None
+        self._array_depth = None
+
+    def feed(self, chunk):
+        for char in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buffer.append(char)
+                elif char == '\\':
+                    self._escape = True
+                    self._buffer.append(char)
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(json.loads('"' + ''.join(self._buffer) + '"'))
+                else:
+                    self._buffer.append(char)
+            elif char == '"':
+                self._in_string = True
+                self._buffer = []
+            elif char in '{[':
+                self._depth += 1
+                if char == '[' and self._depth == 2 and self._pending_key == self.array_key:
+                    self._array_depth = self._depth
+                self._pending_key = None
+            elif char in '}]':
+                if char == ']' and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+            elif char == ':' and self._depth == 1:
+                # The string just read at the top level was a key
+                self._pending_key = self._last_string
+            elif char == ',':
+                self._pending_key = None
+
+    def _end_string(self, value):
+        if self._depth == 1:
+            self._last_string = value
+        elif self._array_depth is not None and self._depth == self._array_depth:
+            self.lines.append(value)
+            self.on_line(value)
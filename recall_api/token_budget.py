@@ -0,0 +1,114 @@
+import copy
+import json
+import math
+
+try:
+    import tiktoken
+except ImportError:  # Optional, fall back to a character based estimate
+    tiktoken = None
+
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Latency budget: prompt tokens we are willing to send in one call, whatever the context window allows
+MAX_PROMPT_TOKENS = 3500
+CHARS_PER_TOKEN = 3.0  # Conservative for JSON heavy English text
+MESSAGE_OVERHEAD_TOKENS = 8  # Role markers and separators per chat message
+
+_encodings = {}
+
+
+def estimate_tokens(text, model="gpt-4"):
+    if tiktoken is not None:
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return len(_encodings[model].encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def prompt_budget(model, completion_tokens, max_prompt_tokens=MAX_PROMPT_TOKENS):
+    # The prompt has to leave room for the completion inside the context window
+    context_window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return min(context_window - completion_tokens, max_prompt_tokens)
+
+
+def fit_summary_to_budget(structured_summary, build_messages, model, completion_tokens, max_prompt_tokens=MAX_PROMPT_TOKENS):
+    """
+    Trim a structured summary until the prompt built from it fits the token budget.
+
+    Bullets are dropped from the end of the longest section first, so every section
+    keeps its leading points for as long as possible. Once each section is down to
+    one bullet, whole sections are dropped from the end, then tags.
+
+    Args:
+        structured_summary (dict): The summary produced by parse_recall_summary.
+        build_messages (callable): Returns the list of strings sent to the model (messages, function schema) for a summary.
+        model (str): The model the prompt is for.
+        completion_tokens (int): The max_tokens reserved for the completion.
+        max_prompt_tokens (int): The latency budget for the prompt.
+
+    Returns:
+        tuple: (the summary that fits, a report dict with the token counts and the trimming decisions)
+    """
+    budget = prompt_budget(model, completion_tokens, max_prompt_tokens)
+
+    def measure(summary):
+        messages = build_messages(summary)
+        return sum(estimate_tokens(message, model) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    original_tokens = tokens = measure(structured_summary)
+    report = {"model": model, "budget": budget, "original_tokens": original_tokens, "decisions": []}
+    if tokens <= budget:
+        report["final_tokens"] = tokens
+        return structured_summary, report
+
+    summary = copy.deepcopy(structured_summary)
+    sections = summary.get("summary", {})
+    dropped = {}
+
+    def item_cost(value):
+        return estimate_tokens(json.dumps(value, ensure_ascii=False), model) + 1
+
+    while tokens > budget:
+        # Per-item costs keep each step cheap, the exact count is taken again once the estimate fits
+        while tokens > budget:
+            longest = max(sections, key=lambda name: len(sections[name]), default=None)
+            if longest is not None and len(sections[longest]) > 1:
+                tokens -= item_cost(sections[longest].pop())
+                dropped[longest] = dropped.get(longest, 0) + 1
+            elif sections:
+                name = list(sections)[-1]
+                tokens -= item_cost(name) + sum(item_cost(bullet) for bullet in sections.pop(name))
+                report["decisions"].append(f"dropped section '{name}'")
+            elif summary.get("tags"):
+                tokens -= item_cost(summary["tags"].pop())
+                dropped["#tags"] = dropped.get("#tags", 0) + 1
+            else:
+                break
+        tokens = measure(summary)
+        if not sections and not summary.get("tags"):
+            break
+
+    report["decisions"] = [
+        f"dropped {count} trailing {'tags' if name == '#tags' else f'bullets from section {name!r}'}"
+        for name, count in dropped.items()
+    ] + report["decisions"]
+    report["final_tokens"] = tokens
+    return summary, report
+
+
+def print_budget_report(report):
+    print(f"Prompt tokens for {report['model']}: {report['original_tokens']} -> {report['final_tokens']} "
+          f"(budget {report['budget']})")
+    for decision in report["decisions"]:
+        print(f"  Trimmed: {decision}")
+    if report["final_tokens"] > report["budget"]:
+        print("  Warning: the prompt is still over budget after trimming")
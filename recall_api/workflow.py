@@ -1,17 +1,38 @@
 import asyncio
-from .getrecall import fetch_recall_data
+from .client import RecallClient
 from .parser import parse_recall_summary
-from .gpt_summary import generate_enhanced_summary
+from .router import model_router
 import json
 import os
 
-async def process_video(video_url):
+# Returned in place of the video URL when the video was skipped as a near-duplicate
+NEAR_DUPLICATE = "near-duplicate"
+
+async def process_video(video_url, bypass_cache=False, client=None, on_script_line=None, job=None, similarity_index=None,
+                        on_script_rejected=None):
+    """
+    Fetch, parse and enhance the Recall summary of one video.
+
+    With a JobContext, both summaries are kept on the job and written to its
+    workspace. Without one they go to the shared operation_data files, which is
+    only safe when a single video is processed at a time. With a SimilarityIndex,
+    videos whose title and bullets nearly match an already processed video are
+    skipped before any GPT work.
+
+    Returns:
+        tuple: (enhanced summary, video URL), (None, NEAR_DUPLICATE) if the video
+        is a near-duplicate, or (None, None) if any step failed.
+    """
     # Create operation_data directory if it doesn't exist
     os.makedirs("operation_data", exist_ok=True)
 
     try:
         # Step 1: Fetch data from Recall API
-        raw_data = await asyncio.to_thread(fetch_recall_data, video_url)
+        if client is None:
+            async with RecallClient() as client:
+                raw_data = await client.fetch(video_url, bypass_cache)
+        else:
+            raw_data = await client.fetch(video_url, bypass_cache)
         if not raw_data:
             print(f"Failed to fetch data for video: {video_url}")
             return None, None
@@ -19,22 +40,75 @@ async def process_video(video_url):
         # Step 2: Parse the raw data into structured summary
         structured_summary = parse_recall_summary(raw_data, video_url)
 
+        # Re-uploads and clips of processed videos are dropped before the GPT, TTS and render stages
+        if similarity_index is not None:
+            # Hashing a long summary takes a while, keep it off the event loop
+            duplicate = await asyncio.to_thread(similarity_index.find_duplicate, structured_summary)
+            if duplicate:
+                duplicate_url, similarity = duplicate
+                print(f"Video {video_url} is a near-duplicate of {duplicate_url} ({similarity:.0%} similar). Skipping...")
+                return None, NEAR_DUPLICATE
+
         # Save structured summary
-        with open("operation_data/structured_summary.json", "w") as f:
-            json.dump(structured_summary, f, indent=2)
+        if job is not None:
+            job.set_summaries(structured_summary=structured_summary)
+        else:
+            with open("operation_data/structured_summary.json", "w") as f:
+                json.dump(structured_summary, f, indent=2)
 
-        # Step 3: Generate enhanced summary using GPT
-        enhanced_summary = await asyncio.to_thread(generate_enhanced_summary, structured_summary)
+        # Step 3: Generate enhanced summary, cheapest model first with escalation on invalid output
+        # With on_script_line, the script is streamed and each line is handed over as soon as it is complete
+        # Lines of an answer that fails validation are handed to on_script_rejected
+        enhanced_summary = await asyncio.to_thread(model_router.generate, structured_summary, on_script_line=on_script_line,
+                                                   on_script_rejected=on_script_rejected)
+        if not enhanced_summary:
+            print(f"Failed to generate enhanced summary for video: {video_url}")
+            return None, None
 
         # Save enhanced summary
-        with open("operation_data/enhanced_summary.json", "w") as f:
-            json.dump(enhanced_summary, f, indent=2)
+        if job is not None:
+            job.set_summaries(enhanced_summary=enhanced_summary)
+        else:
+            with open("operation_data/enhanced_summary.json", "w") as f:
+                json.dump(enhanced_summary, f, indent=2)
 
         return enhanced_summary, video_url
     except Exception as e:
         print(f"Error processing video {video_url}: {str(e)}")
         return None, None
 
+async def process_videos(video_urls, bypass_cache=False, client=None):
+    """
+    Fetch and parse the Recall summaries of many videos in parallel.
+
+    Results are yielded as soon as each one completes, not in input order. The
+    client's concurrency cap bounds how many Recall requests run at once.
+
+    Yields:
+        tuple: (video URL, structured summary), the summary is None if the fetch failed.
+    """
+    own_client = client is None
+    client = client or RecallClient()
+
+    async def fetch_and_parse(video_url):
+        # One bad video must not end the batch for the others
+        try:
+            raw_data = await client.fetch(video_url, bypass_cache)
+            if not raw_data:
+                print(f"Failed to fetch data for video: {video_url}")
+                return video_url, None
+            return video_url, parse_recall_summary(raw_data, video_url)
+        except Exception as e:
+            print(f"Error processing video {video_url}: {str(e)}")
+            return video_url, None
+
+    try:
+        for next_result in asyncio.as_completed([fetch_and_parse(video_url) for video_url in video_urls]):
+            yield await next_result
+    finally:
+        if own_client:
+            await client.close()
+
 # Usage
 if __name__ == "__main__":
     video_url = "https://www.youtube.com/watch?v=LEx2_zLobrM"  # Replace with your video URL
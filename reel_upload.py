@@ -1,8 +1,8 @@
 import os
 from dotenv import load_dotenv
-import requests
 import time
 import json
+from rate_limiter import rate_limited_request
 
 # Load environment variables
 load_dotenv()
@@ -19,7 +19,7 @@ def post_reel(caption, video_url, access_token, instagram_account_id):
         'share_to_feed': 'true',
         'video_url': video_url
     }
-    response = requests.post(url, params=params)
+    response = rate_limited_request("instagram", "POST", url, params=params)
     print("\nResponse:", response.content)
     return response.json()
 
@@ -31,7 +31,7 @@ def status_of_upload(ig_container_id, access_token):
         'access_token': access_token,
         'fields': 'status_code'
     }
-    response = requests.get(url, params=params)
+    response = rate_limited_request("instagram", "GET", url, params=params)
     return response.json()
 
 def publish_container(creation_id, access_token, instagram_account_id):
@@ -42,18 +42,24 @@ def publish_container(creation_id, access_token, instagram_account_id):
         'access_token': access_token,
         'creation_id': creation_id
     }
-    response = requests.post(url, params=params)
+    response = rate_limited_request("instagram", "POST", url, params=params)
     return response.json()
 
-def upload_and_publish_reel(video_url, caption, access_token, instagram_account_id):
-    # Step 1: Create a container for the Reel
-    container_response = post_reel(caption, video_url, access_token, instagram_account_id)
-    if 'id' not in container_response:
-        print("Error creating container:", container_response)
-        return False
+def upload_and_publish_reel(video_url, caption, access_token, instagram_account_id, container_id=None, on_container_created=None,
+                            on_container_failed=None):
+    # Step 1: Create a container for the Reel, unless a container from an interrupted run is being resumed
+    if container_id is None:
+        container_response = post_reel(caption, video_url, access_token, instagram_account_id)
+        if 'id' not in container_response:
+            print("Error creating container:", container_response)
+            return False
 
-    container_id = container_response['id']
-    print(f"Container created with ID: {container_id}")
+        container_id = container_response['id']
+        print(f"Container created with ID: {container_id}")
+        if on_container_created:
+            on_container_created(container_id)
+    else:
+        print(f"Resuming container with ID: {container_id}")
 
     # Step 2: Check the upload status
     while True:
@@ -63,6 +69,9 @@ def upload_and_publish_reel(video_url, caption, access_token, instagram_account_
             break
         elif status.get('status_code') in ['ERROR', 'EXPIRED']:
             print("Error in upload:", status)
+            # The container can't be published anymore, the next attempt has to create a new one
+            if on_container_failed:
+                on_container_failed(container_id)
             return False
         print("Upload in progress, waiting...")
         time.sleep(5)  # Wait for 5 seconds before checking again
@@ -76,21 +85,19 @@ def upload_and_publish_reel(video_url, caption, access_token, instagram_account_
         print("Error publishing reel:", publish_response)
         return False
 
-def upload_reel_from_s3(s3_video_url, part_number):
-    access_token = os.getenv('INSTAGRAM_ACCESS_TOKEN')
-    instagram_account_id = os.getenv('INSTAGRAM_ACCOUNT_ID')
-
-    if access_token is None or instagram_account_id is None:
-        print("Error: INSTAGRAM_ACCESS_TOKEN or INSTAGRAM_ACCOUNT_ID not found in .env file")
-        return False
-
-    # Load the enhanced summary
-    with open("operation_data/enhanced_summary.json", "r") as f:
-        enhanced_summary = json.load(f)
+def build_caption(part_number, job=None):
+    if job is not None:
+        # The summaries of this job, not whichever job wrote the shared files last
+        enhanced_summary = job.enhanced_summary
+        structured_summary = job.structured_summary
+    else:
+        # Load the enhanced summary
+        with open("operation_data/enhanced_summary.json", "r") as f:
+            enhanced_summary = json.load(f)
 
-    # Load the structured summary to get the video title
-    with open("operation_data/structured_summary.json", "r") as f:
-        structured_summary = json.load(f)
+        # Load the structured summary to get the video title
+        with open("operation_data/structured_summary.json", "r") as f:
+            structured_summary = json.load(f)
 
     # Get the video title
     video_title = structured_summary.get("title", "Untitled Video")
@@ -98,6 +105,19 @@ def upload_reel_from_s3(s3_video_url, part_number):
     # Prepare the caption
     caption = f'Part {part_number}: "{video_title}" summary\n\n'
     caption += enhanced_summary['caption']
+    return caption
+
+def publish_reel(s3_video_url, caption, container_id=None, on_container_created=None, on_container_failed=None):
+    access_token = os.getenv('INSTAGRAM_ACCESS_TOKEN')
+    instagram_account_id = os.getenv('INSTAGRAM_ACCOUNT_ID')
+
+    if access_token is None or instagram_account_id is None:
+        print("Error: INSTAGRAM_ACCESS_TOKEN or INSTAGRAM_ACCOUNT_ID not found in .env file")
+        return False
 
     # Upload and publish the reel
-    return upload_and_publish_reel(s3_video_url, caption, access_token, instagram_account_id)
+    return upload_and_publish_reel(s3_video_url, caption, access_token, instagram_account_id, container_id, on_container_created,
+                                   on_container_failed)
+
+def upload_reel_from_s3(s3_video_url, part_number, job=None):
+    return publish_reel(s3_video_url, build_caption(part_number, job))
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("feedparser")
+pytest.importorskip("boto3")
+pytest.importorskip("googleapiclient")
+pytest.importorskip("dotenv")
+
+from monitor import search
+from monitor.feed_cache import FeedCache
+from monitor.feed_state import FeedStateStore
+from monitor.ranking import TopK, make_video_record
+from monitor.search import collect_view_counts, get_top_video_records
+from monitor.views import StaticViewCountProvider
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_video(video_id, hours_old, now=NOW):
+    return {
+        'id': video_id,
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'title': video_id,
+        'published_at': now - timedelta(hours=hours_old)
+    }
+
+
+def old_sort(records, k):
+    # The ranking get_top_videos used before the bounded heap: a stable sort of every candidate
+    return sorted(records, key=lambda record: record['views_per_hour'], reverse=True)[:k]
+
+
+# Views per hour: a/b/c tie at 100 views per hour, d/e tie at 50, f has none in the stub
+CHANNEL_VIDEOS = {
+    "channel-1": [make_video("a", 2), make_video("b", 4), make_video("d", 2)],
+    "channel-2": [make_video("c", 1), make_video("e", 8), make_video("f", 3), make_video("g", 0.5)],
+}
+VIEW_COUNTS = {"a": 200, "b": 400, "c": 100, "d": 100, "e": 400, "g": 1000}
+
+
+def ranked_records():
+    provider = StaticViewCountProvider(VIEW_COUNTS)
+    channel_videos = list(CHANNEL_VIDEOS.items())
+    view_counts = asyncio.run(collect_view_counts(channel_videos, provider))
+    return [make_video_record(channel_id, video, view_counts.get(video['id'], 0), NOW)
+            for channel_id, videos in channel_videos for video in videos]
+
+
+def test_static_view_counts_leave_out_unknown_videos():
+    provider = StaticViewCountProvider(VIEW_COUNTS)
+    assert asyncio.run(provider.get_view_counts(["a", "f", "g"])) == {"a": 200, "g": 1000}
+
+
+@pytest.mark.parametrize("k", range(8))
+def test_top_k_matches_old_sort(k):
+    records = ranked_records()
+    top_k = TopK(k)
+    for record in records:
+        top_k.push(record)
+
+    assert [record['id'] for record in top_k.sorted()] == [record['id'] for record in old_sort(records, k)]
+
+
+def test_ties_keep_the_earliest_candidates():
+    records = ranked_records()
+    top_k = TopK(3)
+    for record in records:
+        top_k.push(record)
+
+    # g scores 1000/hour (age floored at an hour), then the first two of the a/b/c tie in arrival order
+    assert [record['id'] for record in top_k.sorted()] == ["g", "a", "b"]
+
+
+def test_get_top_video_records_with_static_view_counts(tmp_path, monkeypatch):
+    now = datetime.now(timezone.utc)
+    # Distinct scores: the function takes its own "now", so ages and scores only roughly match these
+    channel_videos = {
+        "channel-1": [make_video("a", 2, now), make_video("b", 4, now), make_video("d", 10, now)],
+        "channel-2": [make_video("c", 5, now), make_video("e", 20, now), make_video("f", 3, now)],
+    }
+
+    async def get_latest_videos_rss(channel_id, hours_ago=24, pool=None, feed_cache=None):
+        return channel_videos[channel_id]
+
+    monkeypatch.setattr(search, "get_latest_videos_rss", get_latest_videos_rss)
+    provider = StaticViewCountProvider({"a": 300, "b": 400, "c": 150, "d": 700, "e": 400})
+
+    top_videos = asyncio.run(get_top_video_records(
+        list(channel_videos), max_videos=4, view_count_provider=provider, batch_size=2,
+        feed_cache=FeedCache(str(tmp_path / "feeds.json")), feed_state=FeedStateStore(str(tmp_path / "state.json"))
+    ))
+
+    assert [video['id'] for video in top_videos] == ["a", "b", "d", "c"]
+    assert [video['views'] for video in top_videos] == [300, 400, 700, 150]
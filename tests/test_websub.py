@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import hmac
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+pytest.importorskip("feedparser")
+pytest.importorskip("boto3")
+pytest.importorskip("googleapiclient")
+pytest.importorskip("dotenv")
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from monitor import websub
+from monitor.websub import WebSubReceiver, topic_url
+
+CHANNEL_ID = "UC_x5XG1OV2P6uZZ5FSM9Ttw"
+SECRET = "fake-hub-secret"
+GRANTED_LEASE = 600
+
+NOTIFICATION = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>yt:video:dQw4w9WgXcQ</id>
+    <yt:videoId>dQw4w9WgXcQ</yt:videoId>
+    <yt:channelId>{CHANNEL_ID}</yt:channelId>
+    <title>New upload</title>
+    <published>2024-06-01T12:00:00+00:00</published>
+  </entry>
+</feed>""".encode()
+
+
+class FakeHub:
+    # Accepts subscriptions like pubsubhubbub.appspot.com and verifies them against the callback right away
+    def __init__(self):
+        self.requests = []
+        self.verifications = []
+        self.verified = asyncio.Event()
+        self._tasks = set()
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post("/subscribe", self.handle_subscribe)
+        return app
+
+    async def handle_subscribe(self, request):
+        form = dict(await request.post())
+        self.requests.append(form)
+        task = asyncio.create_task(self.verify(form))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202)
+
+    async def verify(self, form, lease_seconds=GRANTED_LEASE):
+        challenge = f"challenge-{len(self.verifications)}"
+        status, text = await self.ask_callback(form['hub.callback'], {
+            'hub.mode': form['hub.mode'],
+            'hub.topic': form['hub.topic'],
+            'hub.challenge': challenge,
+            'hub.lease_seconds': str(lease_seconds)
+        })
+        self.verifications.append((status, text == challenge))
+        self.verified.set()
+
+    async def ask_callback(self, callback_url, params):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(callback_url, params=params) as response:
+                return response.status, await response.text()
+
+    async def notify(self, callback_url, body, secret=SECRET):
+        headers = {'Content-Type': 'application/atom+xml'}
+        if secret:
+            headers['X-Hub-Signature'] = "sha1=" + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+        async with aiohttp.ClientSession() as session:
+            async with session.post(callback_url, data=body, headers=headers) as response:
+                return response.status
+
+
+async def wait_for(event, timeout=5):
+    await asyncio.wait_for(event.wait(), timeout)
+    event.clear()
+
+
+async def start_servers(on_videos):
+    hub = FakeHub()
+    hub_server = TestServer(hub.create_app())
+    await hub_server.start_server()
+
+    receiver = WebSubReceiver(None, on_videos, hub_url=str(hub_server.make_url("/subscribe")), secret=SECRET)
+    callback_server = TestServer(receiver.create_app())
+    await callback_server.start_server()
+    receiver.callback_url = str(callback_server.make_url(receiver.path))
+    return hub, hub_server, receiver, callback_server
+
+
+async def stop_servers(hub_server, receiver, callback_server):
+    await receiver.stop()
+    await callback_server.close()
+    await hub_server.close()
+
+
+def test_subscribe_verify_and_notify():
+    async def scenario():
+        received = []
+        notified = asyncio.Event()
+
+        async def on_videos(channel_id, videos):
+            received.append((channel_id, videos))
+            notified.set()
+
+        hub, hub_server, receiver, callback_server = await start_servers(on_videos)
+        try:
+            assert await receiver.subscribe(CHANNEL_ID)
+            await wait_for(hub.verified)
+
+            form = hub.requests[0]
+            assert form['hub.mode'] == "subscribe"
+            assert form['hub.topic'] == topic_url(CHANNEL_ID)
+            assert form['hub.callback'] == receiver.callback_url
+            assert form['hub.secret'] == SECRET
+            # The challenge was echoed and the granted lease replaced the requested one
+            assert hub.verifications == [(200, True)]
+            assert receiver.subscriptions[topic_url(CHANNEL_ID)]['lease_seconds'] == GRANTED_LEASE
+
+            assert await hub.notify(receiver.callback_url, NOTIFICATION) == 204
+            await wait_for(notified)
+            [(channel_id, videos)] = received
+            assert channel_id == CHANNEL_ID
+            assert [video['id'] for video in videos] == ["dQw4w9WgXcQ"]
+
+            # Pushes signed with another secret are acknowledged but dropped
+            assert await hub.notify(receiver.callback_url, NOTIFICATION, secret="wrong") == 202
+            await asyncio.sleep(0.1)
+            assert len(received) == 1
+        finally:
+            await stop_servers(hub_server, receiver, callback_server)
+
+    asyncio.run(scenario())
+
+
+def test_rejects_unknown_topics_and_malformed_leases():
+    async def scenario():
+        hub, hub_server, receiver, callback_server = await start_servers(lambda channel_id, videos: None)
+        try:
+            params = {'hub.mode': "subscribe", 'hub.topic': topic_url(CHANNEL_ID), 'hub.challenge': "c"}
+            status, _ = await hub.ask_callback(receiver.callback_url, params)
+            assert status == 404
+
+            receiver.subscriptions[topic_url(CHANNEL_ID)] = {
+                'channel_id': CHANNEL_ID, 'mode': "subscribe", 'requested_at': 0,
+                'lease_seconds': None, 'expires_at': None
+            }
+            for lease in ("soon", "-5"):
+                status, _ = await hub.ask_callback(receiver.callback_url, dict(params, **{'hub.lease_seconds': lease}))
+                assert status == 400
+            assert receiver.subscriptions[topic_url(CHANNEL_ID)]['expires_at'] is None
+        finally:
+            await stop_servers(hub_server, receiver, callback_server)
+
+    asyncio.run(scenario())
+
+
+def test_renews_leases_before_they_expire(monkeypatch):
+    monkeypatch.setattr(websub, "RENEW_CHECK_INTERVAL", 0.05)
+
+    async def scenario():
+        hub, hub_server, receiver, callback_server = await start_servers(lambda channel_id, videos: None)
+        try:
+            await receiver.subscribe(CHANNEL_ID)
+            await wait_for(hub.verified)
+            subscription = receiver.subscriptions[topic_url(CHANNEL_ID)]
+            first_expiry = subscription['expires_at']
+
+            # Less than RENEW_MARGIN of the lease left
+            subscription['expires_at'] -= GRANTED_LEASE * 0.95
+            renew_task = asyncio.create_task(receiver.renew_leases())
+            try:
+                await wait_for(hub.verified)
+            finally:
+                renew_task.cancel()
+
+            assert len(hub.requests) == 2
+            assert hub.requests[1]['hub.mode'] == "subscribe"
+            assert hub.verifications == [(200, True), (200, True)]
+            assert receiver.subscriptions[topic_url(CHANNEL_ID)]['expires_at'] >= first_expiry
+        finally:
+            await stop_servers(hub_server, receiver, callback_server)
+
+    asyncio.run(scenario())